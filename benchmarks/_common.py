@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Shared bits for the benchmarks: timing, environment info and output.
+Results are written as JSON so runs from different commits can be
+compared with ``--compare``.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def get_parser(description):
+    import argparse
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("-o", "--output",
+                        help="write JSON results here instead of stdout")
+    parser.add_argument("-c", "--compare", metavar="JSON",
+                        help="print ratios against an earlier run")
+    parser.add_argument("-q", "--quick", action="store_true",
+                        help="fewer, smaller cases")
+    return parser
+
+
+def environment():
+    import platform
+    import subprocess
+    from datetime import datetime, timezone
+    info = dict(python=platform.python_version(),
+                implementation=platform.python_implementation(),
+                platform=platform.platform(),
+                time=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                commit=None, dirty=None)
+    try:
+        info["commit"] = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+        info["dirty"] = bool(subprocess.check_output(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT, stderr=subprocess.DEVNULL
+        ))
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return info
+
+
+def best_of(func, repeat=3):
+    """Return the fastest of ``repeat`` calls to ``func``, in seconds"""
+    from time import perf_counter
+    best = None
+    for __ in range(repeat):
+        start = perf_counter()
+        func()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_sync(coro):
+    """
+    Run a coroutine that never actually suspends, minus the event loop
+    """
+    try:
+        coro.send(None)
+    except StopIteration as exc:
+        return exc.value
+    coro.close()
+    raise RuntimeError("Coroutine suspended")
+
+
+def result_key(result, fields):
+    return tuple(result.get(k) for k in fields)
+
+
+def write_results(name, params, results, args):
+    doc = dict(benchmark=name, environment=environment(), params=params,
+               results=results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(doc, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(doc, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(args.compare, doc)
+    return doc
+
+
+def compare(path, doc, metric=None):
+    """
+    Print each result's ``metric`` next to that of the matching result
+    in the run saved at ``path``. Results match on the fields named by
+    ``params["key"]``.
+    """
+    with open(path) as f:
+        old = json.load(f)
+    metric = metric or doc["params"]["metric"]
+    fields = doc["params"]["key"]
+    before = {result_key(r, fields): r for r in old["results"]}
+    print("\n%s vs %s (%s)" % (doc["environment"]["commit"],
+                               old["environment"]["commit"], metric),
+          file=sys.stderr)
+    for result in doc["results"]:
+        key = result_key(result, fields)
+        prev = before.get(key)
+        label = " ".join(str(v) for v in key if v is not None)
+        if prev is None or not prev.get(metric):
+            print("  %-48s %12.1f  (new)" % (label, result[metric]),
+                  file=sys.stderr)
+            continue
+        print("  %-48s %12.1f  %+6.1f%%" %
+              (label, result[metric],
+               (result[metric] / prev[metric] - 1) * 100), file=sys.stderr)
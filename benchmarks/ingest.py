@@ -0,0 +1,211 @@
+#!/bin/python3
+# -*- coding: utf-8 -*-
+"""
+How many updates per second can one process absorb? Synthetic traffic
+from the mock exchanges (``clients/mock.py``) is pushed through each
+stage of the ingest path, for several symbol counts and, for Binance,
+several mixes of trades to tickers:
+
+    decode          ``client.loads`` alone
+    consume         the consumer chain, called directly
+    recv_handler    all of the above, plus ``iter_frames`` and the loop,
+                    fed from memory as fast as it'll go
+
+Also timed are ``decimate`` on REST ticker entries and
+``_convert_volume``. Where the work is synchronous, ``tracemalloc``
+measures the bytes allocated per message (peak over baseline, so
+transient garbage counts) and those still held afterwards.
+
+Usage::
+
+    python benchmarks/ingest.py -o before.json
+    python benchmarks/ingest.py --compare before.json > after.json
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import asyncio
+import random
+import sys
+
+import _common
+from _common import best_of, run_sync
+
+from terminal_coin_ticker import decimate
+from terminal_coin_ticker.clients import JSON_TAKES_BYTES, get_client
+from terminal_coin_ticker.clients.catalog import make_catalog
+from terminal_coin_ticker.clients.mock import MOCKS
+
+SYMBOL_COUNTS = (10, 100, 1000)
+TRADE_RATIOS = (0.0, 0.5, 1.0)
+MESSAGES = 20000
+ALLOC_SAMPLE = 2000  # Messages traced per case
+
+
+class FrameSource:
+    """
+    Stands in for a websocket, handing out frames as fast as they're
+    taken. Lacking ``recv``, it's iterated by ``iter_frames``.
+    """
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def __aiter__(self):
+        for frame in self.frames:
+            yield frame
+
+
+def make_client(name, num_symbols, decoder=None):
+    """Return a client that knows and is subscribed to every symbol"""
+    Client = get_client(name)
+    client = Client(0, use_aiohttp=False, json_decoder=decoder)
+    mock = MOCKS[name](num_symbols, seed=1)
+    symbols = {sym: dict(curB=info["base"], curQ=info["quote"],
+                         tick=info["tick"], step="0.001")
+               for sym, info in mock.sim.symbols.items()}
+    client._use_catalog(make_catalog(client.exchange, symbols))
+    client.ticker_subscriptions = set(symbols)
+    if name == "hitbtc":
+        run_sync(client.add_consumer(client.consume_ticker_notes, 5))
+    client.add_update_feed()  # <- as the board would
+    return client, mock
+
+
+def make_frames(mock, num, trade_ratio=None):
+    rand = random.Random(2)
+    syms = sorted(mock.sim.symbols)
+    if trade_ratio is None:
+        return [mock.note(rand.choice(syms)) for __ in range(num)]
+    return [mock.event("%s@%s" % (rand.choice(syms).lower(),
+                                  "aggTrade" if rand.random() < trade_ratio
+                                  else "ticker"))
+            for __ in range(num)]
+
+
+def measure_allocs(func, items):
+    """
+    Return the mean bytes allocated and retained per call of ``func``
+    on each of ``items``, or Nones if peaks can't be reset (< 3.9)
+    """
+    import tracemalloc
+    if not hasattr(tracemalloc, "reset_peak"):
+        return None, None
+    transient = retained = 0
+    tracemalloc.start()
+    try:
+        for item in items:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(item)
+            current, peak = tracemalloc.get_traced_memory()
+            transient += peak - before
+            retained += current - before
+    finally:
+        tracemalloc.stop()
+    return transient / len(items), retained / len(items)
+
+
+def bench(name, func, items, repeat=3, **fields):
+    def loop():
+        for item in items:
+            func(item)
+    seconds = best_of(loop, repeat)
+    alloc, kept = measure_allocs(func, items[:ALLOC_SAMPLE])
+    return dict(name=name, **fields, messages=len(items), seconds=seconds,
+                msgs_per_sec=len(items) / seconds,
+                us_per_msg=seconds / len(items) * 1e6,
+                alloc_bytes_per_msg=alloc, retained_bytes_per_msg=kept)
+
+
+def bench_chain(name, client, frames, repeat=3, **fields):
+    loop = asyncio.new_event_loop()
+    if client.json_decoder in JSON_TAKES_BYTES:
+        frames = [f.encode() for f in frames]
+
+    def run():
+        client.websocket = FrameSource(frames)
+        loop.run_until_complete(client.recv_handler())
+    try:
+        seconds = best_of(run, repeat)
+    finally:
+        loop.close()
+    return dict(name=name, **fields, messages=len(frames), seconds=seconds,
+                msgs_per_sec=len(frames) / seconds,
+                us_per_msg=seconds / len(frames) * 1e6,
+                alloc_bytes_per_msg=None, retained_bytes_per_msg=None)
+
+
+def run_exchange(name, num_symbols, num_msgs, decoder, trade_ratio=None):
+    client, mock = make_client(name, num_symbols, decoder)
+    frames = make_frames(mock, num_msgs, trade_ratio)
+    fields = dict(exchange=name, symbols=num_symbols)
+    if trade_ratio is not None:
+        fields["trade_ratio"] = trade_ratio
+    loads = client.loads
+    messages = [loads(f) for f in frames]
+    consumers = client.consumers
+
+    def consume(message):
+        for consumer in consumers:
+            if run_sync(consumer(message)) is not None:
+                break
+
+    results = [bench("decode", loads, frames, **fields),
+               bench("consume", consume, messages, **fields),
+               bench_chain("recv_handler", client, frames, **fields)]
+    return results, client
+
+
+def run_extras(client, num_msgs):
+    from terminal_coin_ticker.rates import RateGraph
+    from terminal_coin_ticker.ticker import _convert_volume
+    mock = MOCKS["hitbtc"](len(client.symbols), seed=1)
+    fields = dict(exchange="hitbtc", symbols=len(client.symbols))
+    entries = mock.get_ticker()
+    entries = (entries * (num_msgs // len(entries) + 1))[:num_msgs]
+    results = [bench("decimate", decimate, entries, **fields)]
+    rates = RateGraph(client, client.conversions, "USD", client.markets)
+    rates.refresh(rates.pairs)
+    records = sorted(client.ticker.values(), key=lambda r: r.sym)
+    records = (records * (num_msgs // len(records) + 1))[:num_msgs]
+    quotes = {sym: info["curQ"] for sym, info in client.symbols.items()}
+    results.append(bench(
+        "_convert_volume",
+        lambda r: _convert_volume(rates, quotes[r.sym], r), records, **fields
+    ))
+    return results
+
+
+def main():
+    parser = _common.get_parser(__doc__.strip().partition("\n")[0])
+    parser.add_argument("-d", "--decoder",
+                        help="JSON decoder (default: fastest available)")
+    parser.add_argument("-n", "--messages", type=int, default=MESSAGES)
+    args = parser.parse_args()
+    counts = SYMBOL_COUNTS[:2] if args.quick else SYMBOL_COUNTS
+    num_msgs = args.messages // 4 if args.quick else args.messages
+    results = []
+    client = None
+    for num_symbols in counts:
+        start = len(results)
+        out, client = run_exchange("hitbtc", num_symbols, num_msgs,
+                                   args.decoder)
+        results += out
+        for ratio in TRADE_RATIOS:
+            out, __ = run_exchange("binance", num_symbols, num_msgs,
+                                   args.decoder, ratio)
+            results += out
+        results += run_extras(client, num_msgs)
+        for result in results[start:]:
+            print("%-16s %-8s %5d %-4s %10.0f msg/s %8.2f us" %
+                  (result["name"], result["exchange"], result["symbols"],
+                   result.get("trade_ratio", ""), result["msgs_per_sec"],
+                   result["us_per_msg"]), file=sys.stderr)
+    params = dict(messages=num_msgs, symbol_counts=counts,
+                  trade_ratios=TRADE_RATIOS, decoder=client.json_decoder,
+                  metric="msgs_per_sec",
+                  key=("name", "exchange", "symbols", "trade_ratio"))
+    _common.write_results("ingest", params, results, args)
+
+
+if __name__ == "__main__":
+    main()
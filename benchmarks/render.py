@@ -0,0 +1,304 @@
+#!/bin/python3
+# -*- coding: utf-8 -*-
+"""
+What does keeping the board current cost? ``do_run_ticker`` is run for
+real, inside a pseudo-terminal, on a HitBTC client whose notes come
+from an in-memory ``HitBTCMock`` at a fixed rate. One case per board
+size, ``HEADING`` style and palette (256-color or ``HAS_24``), each
+reporting:
+
+    frame_us        from the board's feed draining to its frame being
+                    written, i.e., rates, ranking, painting and flushing
+    bytes           per frame
+    writes          ``write(2)`` calls per frame, more than one meaning
+                    the pty was full
+    latency_ms      from a note being consumed to the frame showing it
+                    being read off the pty's master side, which is the
+                    closest we get to a pixel
+    heading_us      time taken by ``_print_heading``
+
+Both processes stamp with ``time.monotonic()``, which is shared on
+Linux. Frames are counted on the master side by their closing DECRC
+(``ESC 8``), which only works while the cursor query is answered, so a
+case fails if its counts don't match.
+
+Usage::
+
+    python benchmarks/render.py -o before.json
+    python benchmarks/render.py --rows 40 --headings slim full
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import json
+import os
+import sys
+
+import _common
+from ingest import make_client
+
+BOARD_ROWS = (10, 40, 200)
+HEADINGS = ("normal", "hr_over", "hr_under", "full", "slim")
+COLUMNS = 120
+RATE = 1000  # Notes per second, spread over the board
+SECONDS = 2.0
+WARMUP = 0.5
+
+
+def percentile(values, pct):
+    """
+    >>> percentile([3, 1, 2, 4], 50), percentile([3, 1, 2, 4], 100)
+    (2, 4)
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, -(-len(values) * pct // 100) - 1)]
+
+
+def run_board(rows, heading, has_24, seconds, rate, path):
+    """
+    Child side: run the ticker against fed data and dump per-frame stats
+    to ``path``
+    """
+    import asyncio
+    import random
+    import signal
+    from time import monotonic, perf_counter
+    from terminal_coin_ticker import ticker, add_async_sig_handlers
+    from terminal_coin_ticker.display import Compositor
+    #
+    ticker.LOGFILE = None
+    ticker.HEADING = heading
+    ticker.HAS_24 = has_24
+    client, mock = make_client("hitbtc", rows + 3)
+    ranked = list(client.symbols)[3:]
+    marks = {}  # <- sym: time of oldest note not yet painted
+    frames = []
+    headings = []
+    painted = []
+    measuring = False
+
+    class TimedLine(ticker.TickerLine):
+        def paint(self):
+            if not self.pulse:  # <- pulse endings show no new data
+                mark = marks.pop(self.sym, None)
+                if mark is not None:
+                    painted.append(mark)
+            return super().paint()
+
+    writes = 0
+    os_write = os.write
+
+    def counted_write(fd, data):
+        nonlocal writes
+        writes += 1
+        return os_write(fd, data)
+
+    class TimedCompositor(Compositor):
+        def flush(self):
+            before, written = writes, self.bytes_written
+            if not super().flush():
+                return 0
+            frames.append(dict(start=client.drained_at, end=monotonic(),
+                               bytes=self.bytes_written - written,
+                               writes=writes - before,
+                               marks=painted[:], measured=measuring))
+            painted.clear()
+            return frames[-1]["bytes"]
+
+    def print_heading(*args):
+        start = perf_counter()
+        text = ticker._render_heading(*args)
+        sys.stdout.write(text)
+        sys.stdout.flush()
+        headings.append((perf_counter() - start, len(text.encode())))
+
+    add_update_feed = client.add_update_feed
+
+    def timed_feed(*pending):
+        feed = add_update_feed(*pending)
+        drain = feed.drain
+
+        async def timed_drain():
+            dirty = await drain()
+            client.drained_at = monotonic()
+            return dirty
+        feed.drain = timed_drain
+        return feed
+
+    async def subscribe_ticker(sym):
+        client.ticker_subscriptions.add(sym)
+        await client.consume_ticker_notes(client.loads(mock.note(sym)))
+
+    async def unsubscribe_ticker(sym):
+        client.ticker_subscriptions.discard(sym)
+
+    async def feed():
+        nonlocal measuring
+        rand = random.Random(3)
+        interval = 0.005
+        per = max(1, round(rate * interval))
+        loads, consume = client.loads, client.consume_ticker_notes
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        while True:
+            for sym in rand.choices(ranked, k=per):
+                marks.setdefault(sym, monotonic())
+                await consume(loads(mock.note(sym)))
+            await asyncio.sleep(interval)
+            measuring = loop.time() - started > WARMUP
+
+    os.write = counted_write  # <- only the board writes with it
+    ticker.TickerLine = TimedLine
+    ticker.Compositor = TimedCompositor
+    ticker._print_heading = print_heading
+    client.add_update_feed = timed_feed
+    client.subscribe_ticker = subscribe_ticker
+    client.unsubscribe_ticker = unsubscribe_ticker
+    client.drained_at = None
+    #
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    add_async_sig_handlers("SIGINT", loop=loop)
+    feeder = loop.create_task(feed())
+    loop.call_later(seconds + WARMUP, os.kill, os.getpid(), signal.SIGINT)
+    result = loop.run_until_complete(ticker.do_run_ticker(ranked, client,
+                                                          loop))
+    feeder.cancel()
+    with open(path, "w") as f:
+        json.dump(dict(frames=frames, headings=headings,
+                       error=result.get("error")), f)
+
+
+def run_case(rows, heading, has_24, seconds, rate):
+    """
+    Parent side: fork the board into a pty, play terminal and return
+    the case's results
+    """
+    import pty
+    import select
+    import struct
+    import tempfile
+    from time import monotonic
+    from terminal_coin_ticker.ticker import Headings
+    lines = rows + Headings[heading].value + 2
+    fd_tmp, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd_tmp)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid, fd = pty.fork()
+    if pid == 0:
+        import fcntl
+        import termios
+        code = 0
+        try:
+            fcntl.ioctl(1, termios.TIOCSWINSZ,
+                        struct.pack("HHHH", lines, COLUMNS, 0, 0))
+            run_board(rows, heading, has_24, seconds, rate, path)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    #
+    arrivals = []  # <- time each frame was read
+    received = 0
+    tail = b""
+    while True:
+        try:
+            ready, __, __ = select.select([fd], [], [], seconds + 10)
+            if not ready:
+                break
+            data = os.read(fd, 1 << 16)
+        except OSError:  # <- EIO once the child's gone
+            break
+        if not data:
+            break
+        now = monotonic()
+        received += len(data)
+        if b"\x1b[6n" in data:
+            os.write(fd, b"\x1b[%d;1R" % (rows + Headings[heading].value))
+        arrivals += [now] * (tail + data).count(b"\x1b8")
+        tail = data[-1:]
+    __, status = os.waitpid(pid, 0)
+    os.close(fd)
+    try:
+        with open(path) as f:
+            stats = json.load(f)
+    except ValueError:
+        stats = None
+    finally:
+        os.unlink(path)
+    if status or stats is None or stats["error"]:
+        raise RuntimeError("Board %d/%s/%s failed: %s" % (
+            rows, heading, has_24, stats and stats["error"] or status
+        ))
+    # Only holds with absolute addressing, i.e., the cursor query answered
+    if len(arrivals) != len(stats["frames"]):
+        raise RuntimeError("Board %d/%s/%s: read %d frames, but %d written" %
+                           (rows, heading, has_24, len(arrivals),
+                            len(stats["frames"])))
+    #
+    frame_us, nbytes, writes, latency = [], [], [], []
+    for frame, arrived in zip(stats["frames"], arrivals):
+        if not frame["measured"]:
+            continue
+        if frame["start"] is not None:
+            frame_us.append((frame["end"] - frame["start"]) * 1e6)
+        nbytes.append(frame["bytes"])
+        writes.append(frame["writes"])
+        latency += [(arrived - mark) * 1e3 for mark in frame["marks"]]
+    num = len(nbytes) or 1
+    return dict(rows=rows, heading=heading, has_24=has_24,
+                frames=len(nbytes), fps=len(nbytes) / seconds,
+                updates=len(latency),
+                frame_us_p50=percentile(frame_us, 50),
+                frame_us_p99=percentile(frame_us, 99),
+                bytes_per_frame=sum(nbytes) / num,
+                writes_per_frame=sum(writes) / num,
+                latency_ms_p50=percentile(latency, 50),
+                latency_ms_p99=percentile(latency, 99),
+                latency_ms_max=max(latency, default=None),
+                heading_us=stats["headings"][0][0] * 1e6,
+                heading_bytes=stats["headings"][0][1],
+                pty_bytes=received)
+
+
+def main():
+    parser = _common.get_parser(__doc__.strip().partition("\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=BOARD_ROWS)
+    parser.add_argument("--headings", nargs="+", choices=HEADINGS,
+                        default=HEADINGS)
+    parser.add_argument("-s", "--seconds", type=float, default=SECONDS)
+    parser.add_argument("-r", "--rate", type=int, default=RATE,
+                        help="notes per second")
+    args = parser.parse_args()
+    if args.quick:
+        args.rows = [r for r in args.rows if r <= 40]
+        args.headings = args.headings[:1]
+        args.seconds = min(args.seconds, 1.0)
+    results = []
+    for rows in args.rows:
+        for heading in args.headings:
+            for has_24 in (False, True):
+                result = run_case(rows, heading, has_24, args.seconds,
+                                  args.rate)
+                results.append(result)
+                print("%4d %-8s %-5s %6.1f fps %8.0f us %7.0f B %4.1f wr "
+                      "%7.1f ms p50 %7.1f ms p99" %
+                      (rows, heading, has_24, result["fps"],
+                       result["frame_us_p50"] or 0,
+                       result["bytes_per_frame"], result["writes_per_frame"],
+                       result["latency_ms_p50"] or 0,
+                       result["latency_ms_p99"] or 0), file=sys.stderr)
+    params = dict(rows=args.rows, headings=args.headings,
+                  seconds=args.seconds, rate=args.rate, columns=COLUMNS,
+                  metric="frame_us_p50", key=("rows", "heading", "has_24"))
+    _common.write_results("render", params, results, args)
+
+
+if __name__ == "__main__":
+    main()
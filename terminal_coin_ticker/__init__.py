@@ -96,6 +96,110 @@ def decimate(inobj):
     return outobj
 
 
+def places_of(step):
+    """
+    Return the number of decimal places needed to express multiples of
+    ``step``, a numeric string like ``"0.00010000"``
+
+    >>> places_of("0.00010000"), places_of("1."), places_of("10")
+    (4, 0, 0)
+    """
+    from decimal import Decimal
+    return max(0, -Decimal(step).normalize().as_tuple().exponent)
+
+
+def _round_half_even(num, excess):
+    q, r = divmod(num, 10 ** excess)
+    half = 10 ** excess // 2
+    if r > half or (r == half and q % 2):
+        q += 1
+    return q
+
+
+def parse_scaled(value, places):
+    """
+    Convert a numeric string (or int) to an int counting units of
+    ``10 ** -places``. Extra digits are rounded half-to-even, same as
+    ``Decimal.quantize``.
+
+    >>> parse_scaled("0.05432050", 6), parse_scaled("-1.5", 2)
+    (54320, -150)
+    >>> parse_scaled("12", 2), parse_scaled("1.25", 1)
+    (1200, 12)
+    """
+    if isinstance(value, int):
+        return value * 10 ** places
+    whole, __, frac = value.partition(".")
+    if not (whole.lstrip("-").isdigit() and (not frac or frac.isdigit())):
+        from decimal import Decimal  # exponents, etc.
+        return int((Decimal(value) * 10 ** places).to_integral_value())
+    if len(frac) <= places:
+        return int("".join((whole, frac, "0" * (places - len(frac)))))
+    return _round_half_even(int(whole + frac), len(frac) - places)
+
+
+def format_scaled(num, places, to=None):
+    """
+    Inverse of ``parse_scaled``, optionally rounded (half-to-even) or
+    padded to ``to`` decimal places
+
+    >>> format_scaled(54320, 6), format_scaled(-150, 2, to=0)
+    ('0.054320', '-2')
+    >>> format_scaled(7, 0, to=2)
+    '7.00'
+    """
+    if to is not None and to != places:
+        if to < places:
+            num = _round_half_even(num, places - to)
+        else:
+            num *= 10 ** (to - places)
+        places = to
+    if not places:
+        return str(num)
+    digits = str(abs(num)).rjust(places + 1, "0")
+    return "".join(("-" if num < 0 else "", digits[:-places], ".",
+                    digits[-places:]))
+
+
+_epoch_days = {}
+
+
+def iso8601_to_epoch(timestamp):
+    """
+    Convert a UTC timestamp of the fixed form used by HitBTC to float
+    seconds since the epoch. Day offsets are cached per date, so this is
+    mostly slicing and ``int()``. Anything else falls back to
+    ``datetime``.
+
+    >>> iso8601_to_epoch("2018-01-30T05:23:51.979Z")
+    1517289831.979
+    >>> iso8601_to_epoch("2018-01-30T05:23:51Z")
+    1517289831.0
+    """
+    try:
+        if timestamp[10] != "T" or timestamp[-1] != "Z":
+            raise ValueError
+        date = timestamp[:10]
+        try:
+            days = _epoch_days[date]
+        except KeyError:
+            from datetime import date as _date
+            days = _epoch_days[date] = (
+                _date(int(date[:4]), int(date[5:7]), int(date[8:])).toordinal()
+                - 719163  # <- date(1970, 1, 1).toordinal()
+            )
+        secs = (days * 86400 + int(timestamp[11:13]) * 3600 +
+                int(timestamp[14:16]) * 60 + int(timestamp[17:19]))
+        if len(timestamp) > 20:
+            return secs + float(timestamp[19:-1])
+        return float(secs)
+    except (IndexError, ValueError):
+        from datetime import datetime, timezone
+        dts = datetime.strptime(timestamp.replace("Z", "+0000"),
+                                "%Y-%m-%dT%H:%M:%S.%f%z")
+        return dts.astimezone(timezone.utc).timestamp()
+
+
 def ppj(obj, *args, **kwargs):
     """
     Prints collections containing the results of futures.
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Triangular arbitrage, as implied by the best bid/ask of three pairs
+forming a cycle of currencies. Fees are ignored.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import heapq
+
+
+class TriangleScanner:
+    """
+    Every triangle of currencies in ``client.symbols`` is found once and
+    indexed by its three pairs, so ``refresh()`` only re-evaluates those
+    touching pairs that just ticked. A triangle's edge is the better of
+    its two directions, e.g., ETH -> BTC -> USD -> ETH, as a fraction
+    gained, and is only known once all three legs have a bid and ask.
+
+    >>> from types import SimpleNamespace as NS
+    >>> from terminal_coin_ticker.clients import TickerRecord
+    >>> client = NS(symbols={"ETHBTC": dict(curB="ETH", curQ="BTC"),
+    ...                      "ETHUSD": dict(curB="ETH", curQ="USD"),
+    ...                      "BTCUSD": dict(curB="BTC", curQ="USD")},
+    ...             ticker={})
+    >>> for sym, pdp, bid, ask in (("ETHBTC", 4, 500, 501),
+    ...                            ("ETHUSD", 2, 51000, 51010),
+    ...                            ("BTCUSD", 2, 1000000, 1000100)):
+    ...     record = client.ticker[sym] = TickerRecord(sym, pdp=pdp)
+    ...     record.bid, record.ask = bid, ask
+    >>> scanner = TriangleScanner(client)
+    >>> len(scanner.triangles), scanner.refresh({"ETHUSD"})
+    (1, {0})
+    >>> edge, path = scanner.best(1)[0]
+    >>> round(edge, 5), path
+    (0.01786, ('BTC', 'ETH', 'USD', 'BTC'))
+    """
+    def __init__(self, client):
+        self.client = client
+        self.triangles = []  # <- (currencies, legs), legs as (sym, sells)
+        self.by_pair = {}  # <- sym: [triangle index, ...]
+        self.edges = {}  # <- triangle index: (edge, path)
+        #
+        pairs = {}  # <- frozenset({curB, curQ}): sym
+        neighbors = {}
+        for sym in sorted(client.symbols):
+            info = client.symbols[sym]
+            base, quote = info["curB"], info["curQ"]
+            if base == quote or frozenset((base, quote)) in pairs:
+                continue
+            pairs[frozenset((base, quote))] = sym
+            neighbors.setdefault(base, set()).add(quote)
+            neighbors.setdefault(quote, set()).add(base)
+        # Each triangle is found from its lexically smallest currency
+        for a in sorted(neighbors):
+            for b in sorted(n for n in neighbors[a] if n > a):
+                for c in sorted(neighbors[a] & neighbors[b]):
+                    if c <= b:
+                        continue
+                    legs = []
+                    for x, y in ((a, b), (b, c), (c, a)):
+                        sym = pairs[frozenset((x, y))]
+                        legs.append((sym, client.symbols[sym]["curB"] == x))
+                    index = len(self.triangles)
+                    self.triangles.append(((a, b, c), tuple(legs)))
+                    for sym, __ in legs:
+                        self.by_pair.setdefault(sym, []).append(index)
+
+    def _evaluate(self, index):
+        (a, b, c), legs = self.triangles[index]
+        forward = reverse = 1.0
+        for sym, sells in legs:
+            record = self.client.ticker.get(sym)
+            if record is None or not record.bid or not record.ask:
+                self.edges.pop(index, None)
+                return
+            bid = record.bid / 10 ** record.pdp
+            ask = record.ask / 10 ** record.pdp
+            # Selling base at the bid or buying it at the ask
+            forward *= bid if sells else 1 / ask
+            reverse *= 1 / ask if sells else bid
+        if forward >= reverse:
+            self.edges[index] = (forward - 1, (a, b, c, a))
+        else:
+            self.edges[index] = (reverse - 1, (a, c, b, a))
+
+    def refresh(self, symbols):
+        """
+        Re-evaluate triangles having any of ``symbols`` as a leg and
+        return their indexes
+        """
+        touched = set()
+        for sym in symbols:
+            touched.update(self.by_pair.get(sym, ()))
+        for index in touched:
+            self._evaluate(index)
+        return touched
+
+    def best(self, num):
+        """
+        Return the ``num`` best ``(edge, path)`` tuples, best first
+        """
+        return heapq.nlargest(num, self.edges.values())
+
+    def legs_near(self, symbols, currencies):
+        """
+        Return the legs of triangles passing through any of ``symbols``
+        whose third currency is among ``currencies``, e.g., the markets.
+        These are what's needed to watch triangles around displayed
+        pairs without subscribing to most of the exchange.
+        """
+        legs = set()
+        for sym in symbols:
+            info = self.client.symbols[sym]
+            pair = {info["curB"], info["curQ"]}
+            for index in self.by_pair.get(sym, ()):
+                currencies_, triangle_legs = self.triangles[index]
+                third, = set(currencies_) - pair
+                if third in currencies:
+                    legs.update(s for s, __ in triangle_legs)
+        return legs
@@ -37,27 +37,72 @@ import os
 import reprlib
 import sys
 
-try:
-    import websockets
-except ModuleNotFoundError:
-    pass
-try:
-    import aiohttp
-except ModuleNotFoundError:
-    pass
-
 from collections import namedtuple
+from importlib.util import find_spec
+
+from terminal_coin_ticker import places_of, parse_scaled, format_scaled
+from terminal_coin_ticker.clients.catalog import CATALOG_TTL
 
-USE_AIOHTTP = (False if "websockets" in globals() else
-               True if "aiohttp" in globals() else None)
+# Transports are only imported on connect, so just make sure one's around
+HAS_WEBSOCKETS = find_spec("websockets") is not None
+HAS_AIOHTTP = find_spec("aiohttp") is not None
+USE_AIOHTTP = (False if HAS_WEBSOCKETS else
+               True if HAS_AIOHTTP else None)
 if USE_AIOHTTP is None:
     raise SystemExit("Please install websockets or aiohttp")
 
 VERBOSITY = 6
 
+# Lowercased exchange name -> (module, class), imported by ``get_client()``
+EXCHANGES = {
+    "hitbtc": ("terminal_coin_ticker.clients.hitbtc", "HitBTCClient"),
+    "binance": ("terminal_coin_ticker.clients.binance", "BinanceClient"),
+}
+
+# Fastest first. All of these accept ``bytes``, but only those flagged below
+# skip the intermediate ``str``, so there's no point asking transports for
+# undecoded frames otherwise.
+JSON_BACKENDS = ("orjson", "ujson", "json")
+JSON_TAKES_BYTES = {"orjson"}
+
+
+def get_json_decoder(name=None):
+    """
+    Return a tuple of ``(name, loads)`` for the named JSON backend or, if
+    it's missing, not one of ``JSON_BACKENDS`` or None, the fastest one
+    installed. Anything else could be made to decode frames off the wire,
+    e.g., ``pickle``.
+
+    >>> get_json_decoder("pickle")[0] in JSON_BACKENDS
+    True
+    """
+    from importlib import import_module
+    candidates = ((name, *JSON_BACKENDS) if name in JSON_BACKENDS else
+                  JSON_BACKENDS)
+    for candidate in candidates:
+        try:
+            return candidate, import_module(candidate).loads
+        except (ImportError, AttributeError):
+            continue
+    raise RuntimeError("Unreachable: stdlib json always available")
+
+
+JSON_DECODER = get_json_decoder()[0]
+
+
+def get_client(exchange):
+    """
+    Import and return the client class for ``exchange``, which must be a
+    key (case-insensitive) of ``EXCHANGES``.
+    """
+    from importlib import import_module
+    module, name = EXCHANGES[exchange.lower()]
+    return getattr(import_module(module), name)
+
+
 Transmap = namedtuple("Transmap",
                       "sym time last volB volQ bid ask "
-                      "open chg chgP curB curQ tick")
+                      "open chg chgP curB curQ tick step")
 
 Background = namedtuple("Background",
                         "shade tint dark red mix_red green mix_green")
@@ -72,51 +117,199 @@ default_fg = Foreground(*("\x1b[38;5;%sm" % n for n in
                           "253 250 243 237 236 95 167;1 65 83;1 228".split()))
 
 
+class TruecolorPalette:
+    """
+    Class attribute that builds a 24-bit palette from the owning class's
+    hex colors (``background_hex``, etc.) on first access. Is None if
+    there are none.
+    """
+    def __init__(self, plane):
+        self.plane = plane
+        self.palettes = {}
+
+    def __get__(self, instance, owner):
+        try:
+            return self.palettes[owner]
+        except KeyError:
+            pass
+        colors = getattr(owner, "%s_hex" % self.plane)
+        palette = self.palettes[owner] = (
+            None if colors is None else
+            make_truecolor_palette(self.plane, **colors)
+        )
+        return palette
+
+
+class TickerRecord:
+    """
+    Latest values for one symbol, parsed once by the consumer that
+    received them. Prices and quote volume are ints counting units of
+    ``10 ** -pdp`` (the symbol's tick size), base volume units of
+    ``10 ** -qdp`` (its quantity step). ``chgP`` is a float, and so is
+    ``time``, in seconds since the epoch. Fields that haven't arrived
+    yet are None.
+    """
+    __slots__ = ("sym", "pdp", "qdp", "time", "last", "volB", "volQ", "bid",
+                 "ask", "open", "chgP")
+    fields = __slots__[3:]
+
+    def __init__(self, sym, pdp=8, qdp=8):
+        self.sym = sym
+        self.pdp = pdp
+        self.qdp = qdp
+        self.time = self.last = self.volB = self.volQ = None
+        self.bid = self.ask = self.open = self.chgP = None
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__,
+                           ", ".join("%s=%r" % i for i in self.items()))
+
+    def items(self):
+        return ((k, getattr(self, k)) for k in ("sym", *self.fields))
+
+    def places(self, key):
+        return self.qdp if key == "volB" else self.pdp
+
+    def as_dict(self):
+        """
+        Native JSON-friendly version, prices and volumes as strings
+        """
+        return {k: (format_scaled(v, self.places(k)) if
+                    isinstance(v, int) and k not in ("time", "chgP") else v)
+                for k, v in self.items()}
+
+    def update(self, fields):
+        """
+        Parse and store raw (exchange) values from a mapping with our keys
+        """
+        for key, value in fields.items():
+            if value is None or key in ("sym", "time"):
+                pass
+            elif key == "chgP":
+                value = float(value)
+            else:
+                value = parse_scaled(value, self.places(key))
+            setattr(self, key, value)
+
+
+class UpdateFeed:
+    """
+    Collects symbols marked dirty by consumers since the last ``drain()``.
+    Each reader (the board, etc.) should register its own via
+    ``ExchangeClient.add_update_feed()``.
+    """
+    def __init__(self, *pending):
+        self.pending = set(pending)
+        self.event = asyncio.Event()
+        if self.pending:
+            self.event.set()
+
+    def push(self, symbol):
+        self.pending.add(symbol)
+        self.event.set()
+
+    async def drain(self):
+        await self.event.wait()
+        self.event.clear()
+        pending, self.pending = self.pending, set()
+        return pending
+
+
 class ExchangeClient:
     """
     These attrs must exist: {"exchange", "url", "url_vol", "trans"}
     """
     background_256 = default_bg
     foreground_256 = default_fg
-    background_24 = None
-    foreground_24 = None
+    background_hex = None
+    foreground_hex = None
+    background_24 = TruecolorPalette("background")
+    foreground_24 = TruecolorPalette("foreground")
 
-    quantize = False
     prepopulate = False
+    reply_timeout = 10
+    catalog_ttl = CATALOG_TTL  # <- falsy to always fetch
 
     def __init__(self, verbosity=VERBOSITY, logfile=None,
-                 use_aiohttp=USE_AIOHTTP):
+                 use_aiohttp=USE_AIOHTTP, json_decoder=JSON_DECODER,
+                 capture=None, replay=None, replay_speed=1.0,
+                 latency=False, metrics=None):
         self.verbose = verbosity
         self.log = logfile if logfile else sys.stderr
-        if use_aiohttp and "aiohttp" not in globals():
+        if use_aiohttp and not HAS_AIOHTTP:
             self.echo("Can't find the aiohttp module. Trying websockets.", 3)
             use_aiohttp = False
-        elif not use_aiohttp and "websockets" not in globals():
+        elif not use_aiohttp and not HAS_WEBSOCKETS:
             use_aiohttp = True
         self.aio = use_aiohttp
+        self.json_decoder, self.loads = get_json_decoder(json_decoder)
+        if json_decoder and self.json_decoder != json_decoder:
+            self.echo(("Can't find the %s module. Using %s." if
+                       json_decoder in JSON_BACKENDS else
+                       "%r isn't a supported JSON decoder. Using %s.") %
+                      (json_decoder, self.json_decoder), 3)
         #
-        self.ticker = {}
+        self.ticker = {}  # <- symbol: TickerRecord
+        self._places = {}
         self.symbols = None
         self.markets = None
         self.conversions = None
+        self.aliases = None
+        self.catalog_Task = None
         self.ticker_subscriptions = set()
+        self.update_feeds = []
+        self.key_waiters = {}
+        self.subscribed_at = {}
+        self.first_data = {}  # <- secs from subscribing till first update
         self._consumers = {self.consume_response: 0}
         self.consumers = [self.consume_response]  # Ranked version of above
         self.prepop_Task = None
+        self.rqids = iter(range(1, sys.maxsize))
+        self.replies = {}
+        self._rest = None
+        self.capture = capture  # <- path to append raw frames to
+        self.recorder = None
+        self.replay = replay  # <- path of capture to play instead
+        if replay:
+            self.catalog_ttl = 0  # <- symbols come from the capture
+        self.replay_speed = replay_speed
+        self._replay = None
+        self.latency = None
+        if latency:
+            from terminal_coin_ticker.latency import LatencyTracker
+            self.latency = LatencyTracker(self.clock)
+        self.metrics = metrics  # <- [host:]port or unix:path to serve at
+        self.exporter = None
         # These are only for logging send/recv raw message i/o
         try:
             reprlib.aRepr.maxstring = os.get_terminal_size().columns - 2
-        except AttributeError:
+        except (AttributeError, OSError):  # <- OSError when not a tty
             pass
         self.lrepr = reprlib.aRepr.repr
 
     async def __aenter__(self, url=None):
         if not url:
             url = self.url
-        if self.aio:
+        if self.capture:
+            self.get_recorder().note(url)
+        if self.metrics:
+            try:
+                await self.get_exporter().start()
+            except (OSError, ValueError) as exc:  # <- port taken, bad path
+                self.echo("Couldn't serve metrics at %s: %s. Running "
+                          "without them." % (self.metrics, exc), 3)
+                self.metrics = self.exporter = None
+        if self.exporter is not None:
+            self.exporter.connects += 1
+        if self.replay:
+            self._conn = self.get_replay()
+            self.websocket = await self._conn.__aenter__()
+        elif self.aio:
+            import aiohttp
             self._conn = aiohttp.ClientSession()
             self.websocket = await self._conn.ws_connect(url).__aenter__()
         else:
+            import websockets
             self._conn = websockets.connect(url)
             self.websocket = await self._conn.__aenter__()
         # Start reading messages
@@ -124,11 +317,66 @@ class ExchangeClient:
         return self
 
     async def __aexit__(self, *args, **kwargs):
+        for fut in self.replies.values():
+            fut.cancel()
+        self.replies.clear()
+        if self.catalog_Task is not None and not self.catalog_Task.done():
+            self.catalog_Task.cancel()
+        if self._rest is not None:
+            await self._rest.close()
+            self._rest = None
         try:
             self.active_recv_Task.cancel()
             await self._conn.__aexit__(*args, **kwargs)
         except AttributeError:
             pass
+        if self.recorder is not None:
+            error = self.recorder.close()
+            if error is not None:
+                self.echo("Capture to %s failed after %d frames: %r" %
+                          (self.capture, self.recorder.frames, error), 3)
+            else:
+                self.echo("Captured %d frames (%d bytes) to %s" %
+                          (self.recorder.frames, self.recorder.bytes_written,
+                           self.capture))
+            self.recorder = None
+        if self.exporter is not None:
+            await self.exporter.stop()
+
+    def get_recorder(self):
+        if self.recorder is None:
+            from .capture import FrameRecorder
+            self.recorder = FrameRecorder(self.capture)
+            self.echo("Capturing frames to %s" % self.capture)
+        return self.recorder
+
+    def get_replay(self):
+        if self._replay is None:
+            from .replay import ReplaySocket
+            self._replay = ReplaySocket(
+                self.replay, self.replay_speed,
+                as_bytes=self.json_decoder in JSON_TAKES_BYTES
+            )
+            self.echo("Replaying %s at %s" %
+                      (self.replay, "%gx" % self.replay_speed if
+                       self.replay_speed else "max speed"))
+        return self._replay
+
+    def get_exporter(self):
+        if self.exporter is None:
+            from terminal_coin_ticker.metrics import MetricsExporter
+            self.exporter = MetricsExporter(self, self.metrics)
+        return self.exporter
+
+    def clock(self):
+        """
+        Current time in epoch seconds, as far as the feed is concerned.
+        While replaying, that's the capture's.
+        """
+        if self._replay is not None:
+            return self._replay.clock()
+        from time import time
+        return time()
 
     def echo(self, msg, level=6):
         if (level > self.verbose):
@@ -167,6 +415,103 @@ class ExchangeClient:
             sorted((weight, func) for func, weight in self._consumers.items())
         ]
 
+    def add_update_feed(self, *pending):
+        feed = UpdateFeed(*pending)
+        self.update_feeds.append(feed)
+        return feed
+
+    def remove_update_feed(self, feed):
+        try:
+            self.update_feeds.remove(feed)
+        except ValueError:
+            pass
+
+    def mark_dirty(self, symbol, fresh=True):
+        """
+        Consumers call this after changing ``self.ticker[symbol]``. Pass
+        ``fresh=False`` for records that didn't come off the wire, e.g.,
+        prepopulated ones.
+        """
+        for feed in self.update_feeds:
+            feed.push(symbol)
+        if symbol in self.key_waiters:
+            self._notify_ready(symbol)
+        if fresh and self.latency is not None:
+            self.latency.consumed(symbol, self.ticker[symbol].time)
+        if fresh and symbol in self.subscribed_at:
+            started = self.subscribed_at.pop(symbol)
+            self.first_data[symbol] = (asyncio.get_event_loop().time() -
+                                       started)
+            self.echo("First data for %r after %.3fs" %
+                      (symbol, self.first_data[symbol]), 7)
+
+    def get_record(self, symbol):
+        try:
+            return self.ticker[symbol]
+        except KeyError:
+            record = self.ticker[symbol] = TickerRecord(
+                symbol, *self.get_places(symbol)
+            )
+            return record
+
+    def get_places(self, symbol):
+        """
+        Return the decimal places of ``symbol``'s tick size and quantity
+        step. See ``TickerRecord``.
+        """
+        try:
+            return self._places[symbol]
+        except KeyError:
+            info = self.symbols.get(symbol) if self.symbols else None
+            if info is None:
+                places = (8, 8)
+            else:
+                places = (places_of(info["tick"]),
+                          places_of(info.get("step") or "1e-8"))
+            self._places[symbol] = places
+            return places
+
+    def _notify_ready(self, symbol):
+        record = self.ticker[symbol]
+        waiters = self.key_waiters[symbol]
+        for key in [k for k in waiters if
+                    getattr(record, k, None) is not None]:
+            fut = waiters.pop(key)
+            if not fut.done():
+                fut.set_result(symbol)
+        if not waiters:
+            del self.key_waiters[symbol]
+
+    def wait_for_key(self, symbol, key):
+        """
+        Return a future that's done once ``self.ticker[symbol]`` has a
+        value for ``key``. Consumers signal this via ``mark_dirty()``.
+        """
+        if getattr(self.ticker.get(symbol), key, None) is not None:
+            fut = asyncio.get_event_loop().create_future()
+            fut.set_result(symbol)
+            return fut
+        waiters = self.key_waiters.setdefault(symbol, {})
+        if key not in waiters or waiters[key].cancelled():
+            waiters[key] = asyncio.get_event_loop().create_future()
+        return waiters[key]
+
+    def start_clock(self, symbol):
+        """
+        Note subscription time for ``self.first_data``
+        """
+        self.subscribed_at[symbol] = asyncio.get_event_loop().time()
+
+    def stream_type(self, message):
+        """
+        Label for counting ``message`` in the metrics
+        """
+        if not isinstance(message, dict):
+            return "other"
+        if "id" in message:
+            return "reply"
+        return message.get("method") or "other"
+
     async def consume_response(self, message):
         """
         Currently, this should return non-null to short-circuit (stop
@@ -176,27 +521,131 @@ class ExchangeClient:
         """
         raise NotImplementedError
 
-    async def do_send(self, message):
+    def prep_request(self, method, payload, rqid=None):
+        """
+        Return an id and a serialized request of the jsonrpc-ish form
+        both exchanges understand. Pass both to ``do_send``, which
+        registers a future for the reply in ``self.replies`` until it's
+        answered or timed out (see ``check_replies``).
+
+        Neither the jsonrpc spec nor the api docs mention max size for
+        ``id``. If they did, it'd probably be better to catch
+        ``StopIteration`` and remake the ws connection when approaching
+        this limit. Or, if the server resets its cache at that point,
+        use ``itertools.cycle`` and keep on going. If the server simply
+        forgets the ids of fulfilled requests and/or overwrites
+        duplicates, then this is pointless.
+        .. _: http://www.jsonrpc.org/specification
+        """
+        if rqid is None:
+            rqid = next(self.rqids)
+        outdict = dict(method=method, params=payload, id=rqid)
+        # No need for bytes
+        return rqid, json.dumps(outdict)
+
+    def _resolve_reply(self, rqid, result):
+        try:
+            fut = self.replies[int(rqid)]
+        except (KeyError, TypeError, ValueError):
+            self.echo("Unexpected reply id: %r" % rqid, level=5)
+            return
+        if not fut.done():
+            fut.set_result(result)
+
+    async def check_replies(self, rqid, timeout=None):
+        """
+        Wait for the reply to a request sent by ``do_send``.
+        Errors reported by the server are returned, not raised.
+        """
+        if timeout is None:
+            timeout = self.reply_timeout
+        try:
+            return await asyncio.wait_for(self.replies[rqid], timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("No reply to request %d after %s seconds" %
+                                  (rqid, timeout))
+        finally:
+            self.replies.pop(rqid, None)
+
+    async def do_send(self, message, rqid=None):
         if self.verbose > 6:
             print("> {}".format(self.lrepr(message)), file=self.log)
+        if self.recorder is not None:
+            self.recorder.sent(message)
+        if rqid is not None:  # <- before sending, lest the reply beat us
+            self.replies[rqid] = asyncio.get_event_loop().create_future()
+        try:
+            if self.aio:
+                await self.websocket.send_str(message)
+            else:
+                await self.websocket.send(message)
+        except BaseException:
+            if rqid is not None:
+                self.replies.pop(rqid, None)  # <- never checked
+            raise
+
+    async def iter_frames(self):
+        """
+        Yield raw frames, as undecoded ``bytes`` when both the transport
+        and ``self.loads`` allow. Newer versions of websockets (13+) can
+        skip UTF-8 decoding text frames. Aiohttp always decodes them.
+        """
+        ws = self.websocket
+        if self.replay:
+            async for raw_message in ws:
+                yield raw_message
+            return
         if self.aio:
-            await self.websocket.send_str(message)
-        else:
-            await self.websocket.send(message)
+            async for raw_message in ws:
+                yield raw_message.data
+            return
+        if self.json_decoder not in JSON_TAKES_BYTES:
+            async for raw_message in ws:
+                yield raw_message
+            return
+        from inspect import signature
+        recv = getattr(ws, "recv", None)  # <- absent in bare async iterables
+        if recv is None or "decode" not in signature(recv).parameters:
+            async for raw_message in ws:
+                yield raw_message
+            return
+        from websockets import exceptions
+        closed_ok = getattr(exceptions, "ConnectionClosedOK", ())
+        try:
+            while True:
+                yield await ws.recv(decode=False)
+        except closed_ok:
+            return
 
     async def recv_handler(self):
         if self.verbose:
             self.echo("Starting receive handler")
             if self.aio:
                 self.echo("Using aiohttp instead of websockets")
+            self.echo("Using %s for decoding" % self.json_decoder)
+        loads = self.loads
+        capture = self.recorder and self.recorder.received
+        latency = self.latency
+        exporter = self.exporter
         try:
-            async for raw_message in self.websocket:
-                if self.aio:
-                    raw_message = raw_message.data
+            async for raw_message in self.iter_frames():
+                if latency:
+                    latency.received = self.clock()
+                if capture:
+                    capture(raw_message)
                 if self.verbose > 6:
                     print("< {}".format(self.lrepr(raw_message)),
                           file=self.log)
-                message = json.loads(raw_message)
+                try:
+                    message = loads(raw_message)
+                except ValueError as exc:
+                    if exporter:
+                        exporter.decode_errors += 1
+                    self.echo("Couldn't decode %s: %s" %
+                              (self.lrepr(raw_message), exc), 3)
+                    continue
+                if exporter:
+                    exporter.count(self.stream_type(message))
                 # Existing consumers are just regular subroutines for sorting
                 # messages, and their non-null return vals go unused.  If the
                 # point is to start these in order but wait till they all
@@ -208,13 +657,93 @@ class ExchangeClient:
             # Set value of ``self.active_recv_Task._result``
             return "recv_handler exited"
 
-    async def get_symbols(self):
+    async def get_rest(self, endpoint):
+        """
+        GET one of the ``self.rest`` endpoints and return the decoded
+        body without blocking the loop. Raises ``ConnectionError``.
+        """
+        url = "".join((self.rest["base"], self.rest[endpoint]))
+        if self.verbose > 6:
+            print("GET {}".format(url), file=self.log)
+        if self.replay:
+            body = self.get_replay().rest.get(url)
+            if body is None:
+                raise ConnectionError("No reply to GET %s in %s" %
+                                      (url, self.replay))
+            data = self.loads(body)
+        else:
+            if self._rest is None:
+                from terminal_coin_ticker.clients.rest import RestSession
+                self._rest = RestSession(self.loads,
+                                         use_aiohttp=self.aio and HAS_AIOHTTP)
+            data = await self._rest.get_json(url)
+        if self.capture:
+            self.get_recorder().fetched(url, data)
+        return data
+
+    def parse_time(self, timestamp):
+        """
+        Convert a native timestamp to float seconds since the epoch
+        """
+        raise NotImplementedError
+
+    async def fetch_symbols(self):
         """
-        This must populate a dict called ``self.symbols`` and a set
-        called ``self.markets``
+        Return a dict of native symbols to dicts with keys ``curB``,
+        ``curQ``, ``tick`` and ``step``
         """
         raise NotImplementedError
 
+    async def get_symbols(self, symbol=None):
+        """
+        Populate ``self.symbols``, ``self.markets``, etc. from the on-disk
+        catalog, if there's one, and return info for ``symbol`` or a list
+        of all. Expired catalogs are still used while a fresh one is
+        fetched in the background. Captures always fetch, so replays
+        get the recorded symbols.
+        """
+        if self.symbols is None:
+            from terminal_coin_ticker.clients.catalog import load_catalog
+            catalog = None
+            if self.catalog_ttl and not self.capture:
+                catalog = load_catalog(self.exchange)
+            if catalog is None:
+                await self.refresh_symbols()
+            else:
+                from time import time
+                self._use_catalog(catalog)
+                if time() - catalog["saved"] > self.catalog_ttl:
+                    self.catalog_Task = asyncio.ensure_future(
+                        self._refresh_expired()
+                    )
+        if symbol is None:
+            return list(self.symbols.values())
+        else:
+            return self.symbols[symbol]
+
+    async def refresh_symbols(self):
+        from terminal_coin_ticker.clients.catalog import (
+            make_catalog, save_catalog
+        )
+        catalog = make_catalog(self.exchange, await self.fetch_symbols())
+        self._use_catalog(catalog)
+        if self.catalog_ttl:
+            loop = asyncio.get_event_loop()
+            if await loop.run_in_executor(None, save_catalog, catalog) is None:
+                self.echo("Couldn't save symbol catalog", 4)
+
+    async def _refresh_expired(self):
+        try:
+            await self.refresh_symbols()
+        except Exception as exc:  # <- background task, so nobody else will
+            self.echo("Couldn't refresh symbol catalog: %r" % exc, 3)
+
+    def _use_catalog(self, catalog):
+        self.symbols = catalog["symbols"]
+        self.markets = set(catalog["markets"])
+        self.conversions = set(catalog["conversions"])
+        self.aliases = catalog["aliases"]
+
     async def canonicalize_pair(self, pair, as_tuple=False):
         # Unfortunately, base/quote currency ids are not always the same as the
         # concatenated pair, e.g., "BXTUSDT" != "BXT" + "USD". So probably best
@@ -225,15 +754,11 @@ class ExchangeClient:
             assert self.symbols is not None
         if as_tuple is False and pair in self.symbols:
             return pair
-        if not pair.isalnum():
-            sep = [c for c in pair if not c.isalnum()].pop()
-            pair = pair.replace(sep, "")
-        pair = pair.upper()
-        if pair not in self.symbols:
-            if pair.endswith("USD") and pair + "T" in self.symbols:
-                pair += "T"
-            else:
-                raise ValueError("%r not found in client.symbols" % pair)
+        key = "".join(c for c in pair if c.isalnum()).upper()
+        try:
+            pair = self.aliases[key]
+        except KeyError:
+            raise ValueError("%r not found in client.symbols" % key)
         if as_tuple:
             base = self.symbols[pair]["curB"]
             quote = self.symbols[pair]["curQ"]
@@ -241,12 +766,8 @@ class ExchangeClient:
         return pair
 
     async def get_market_conversion_pairs(self, quote=None):
-        if not self.markets:
+        if self.conversions is None:
             await self.get_symbols()
-        if not self.conversions:
-            from itertools import permutations
-            all_convs = {"".join(p) for p in permutations(self.markets, 2)}
-            self.conversions = all_convs & self.symbols.keys()
         if quote:
             if "USD" in quote:
                 # Assume USD is always the dominant quote currency
@@ -264,16 +785,8 @@ class ExchangeClient:
         """
         if not self.markets:
             await self.get_symbols()
-        import json
-        import urllib.request
         from decimal import Decimal as Dec
-        from urllib.error import HTTPError
-        url = "".join((self.rest["base"], self.rest["ticker"]))
-        try:
-            with urllib.request.urlopen(url) as f:
-                data = json.load(f)
-        except HTTPError:
-            raise ConnectionError("Problem connecting; try again later")
+        data = await self.get_rest("ticker")
         if "error" in data:
             raise ConnectionError(data["error"])
         #
@@ -316,13 +829,17 @@ class ExchangeClient:
         in short order.
         """
         tr = self.trans
-        return {
+        out = {
             d[tr.sym]: {
                 us: d[them] for us, them in tr._asdict().items() if
                 them and d.get(them) is not None
             }
             for d in data
         }
+        for record in out.values():
+            if "time" in record:
+                record["time"] = self.parse_time(record["time"])
+        return out
 
 
 def _hex_to_rgb(hstr):
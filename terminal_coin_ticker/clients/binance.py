@@ -11,10 +11,10 @@ Stylesheet_:
 import asyncio
 
 from terminal_coin_ticker import (
-    add_async_sig_handlers, remove_async_sig_handlers, ppj
+    add_async_sig_handlers, remove_async_sig_handlers, ppj, parse_scaled
 )
 from terminal_coin_ticker.clients import (
-    USE_AIOHTTP, Transmap, ExchangeClient, make_truecolor_palette
+    USE_AIOHTTP, Transmap, ExchangeClient
 )
 
 VERBOSITY = 6
@@ -34,7 +34,8 @@ tmap = Transmap(
     chgP="priceChangePercent",
     curB="baseAsset",
     curQ="quoteAsset",
-    tick="tickSize"
+    tick="tickSize",
+    step="stepSize"
 )
 
 bg_v1 = {
@@ -73,8 +74,6 @@ fg_v2.update({
 # TODO add getter (or whatever) so this can be set dynamically
 background = bg_v2
 foreground = fg_v2
-truecolor_bg = make_truecolor_palette("background", **background)
-truecolor_fg = make_truecolor_palette("foreground", **foreground)
 
 
 class BinanceClient(ExchangeClient):
@@ -129,59 +128,101 @@ class BinanceClient(ExchangeClient):
         "symbols": "/exchangeInfo"
     }
     trans = tmap
-    background_24 = truecolor_bg
-    foreground_24 = truecolor_fg
+    background_hex = background
+    foreground_hex = foreground
 
     def __init__(self, verbosity=VERBOSITY, logfile=None,
-                 use_aiohttp=USE_AIOHTTP):
+                 use_aiohttp=USE_AIOHTTP, **kwargs):
         self.lock = asyncio.Lock()
         self.streams = set()
-        self.quantize = True
+        self._pending_streams = {}
+        self._sync_Task = None
         self.prepopulate = True
-        super().__init__(verbosity, logfile, use_aiohttp)
-
-    async def _reload(self):
-        if self.lock.locked():
-            return None
-        await self.lock.acquire()
-        try:
-            if hasattr(self, "_conn"):
-                await self.__aexit__(None, None, None)
-            # Wait while url modified
-            settled = set()
-            while self.streams != settled:
-                self.echo("Waiting till settled: %r" %
-                          (self.streams ^ settled), 7)
-                settled = set(self.streams)
-                await asyncio.sleep(0.1)
-            self.echo("Settled: %r" % (self.streams), 7)
-            #
-            if not self.streams:
-                self.echo("No streams to consume")
-                return None
-            #
-            path = "/stream"
-            streams = "/".join(self.streams)
-            query = "".join(("?streams=", *streams))
-            url = "".join((self.url, path, query))
-            self.echo("Query: %r" % query)
-            await super().__aenter__(url)
-        finally:
-            self.lock.release()
+        super().__init__(verbosity, logfile, use_aiohttp, **kwargs)
 
     async def __aenter__(self):
         """
-        Logic from parent method moved to self._reload
+        Connecting is deferred till the first batch of streams is ready.
+        See ``self._send_stream_changes``.
         """
         return self
 
+    def _queue_streams(self, *names, subscribe=True):
+        for name in names:
+            self._pending_streams[name] = subscribe
+
+    async def _sync_streams(self):
+        """
+        Flush queued stream changes and wait for them to be acknowledged.
+        Callers arriving while a flush is underway get folded into it.
+        Return a dict of streams whose changes were refused, with errors.
+        """
+        if self._sync_Task is None or self._sync_Task.done():
+            self._sync_Task = asyncio.ensure_future(
+                self._send_stream_changes()
+            )
+        return await asyncio.shield(self._sync_Task)
+
+    async def _send_stream_changes(self):
+        """
+        The first batch determines the combined-stream URL. Later ones are
+        sent over the open connection as ``SUBSCRIBE``/``UNSUBSCRIBE``
+        requests, one of each per batch at most.
+        """
+        # Let concurrent callers (``gather()``, etc.) enqueue theirs
+        await asyncio.sleep(0)
+        failed = {}  # <- stream name: error
+        async with self.lock:
+            while self._pending_streams:
+                pending, self._pending_streams = self._pending_streams, {}
+                adds = {n for n, sub in pending.items() if sub} - self.streams
+                drops = {n for n, sub in pending.items() if
+                         not sub} & self.streams
+                if getattr(self, "websocket", None) is None:
+                    if not adds:
+                        self.echo("No streams to consume")
+                        continue
+                    query = "".join(("?streams=", "/".join(sorted(adds))))
+                    self.echo("Query: %r" % query)
+                    await super().__aenter__("".join((self.url, "/stream",
+                                                      query)))
+                    self.streams |= adds
+                    adds = set()
+                for method, names in (("UNSUBSCRIBE", drops),
+                                      ("SUBSCRIBE", adds)):
+                    if not names:
+                        continue
+                    rqid, message = self.prep_request(method, sorted(names))
+                    await self.do_send(message, rqid)
+                    result = await self.check_replies(rqid)
+                    if result is not None:
+                        self.echo("%s failed: %r" % (method, result), level=3)
+                        failed.update(dict.fromkeys(names, result))
+                    elif method == "SUBSCRIBE":
+                        self.streams |= names
+                    else:
+                        self.streams -= names
+        self.echo("Streams: %r" % (self.streams), 7)
+        return failed
+
+    def stream_type(self, message):
+        if isinstance(message, dict) and "stream" in message:
+            return message["stream"].partition("@")[-1]
+        return super().stream_type(message)
+
     async def consume_response(self, message):
-        if not self.ticker_subscriptions:
-            self.echo("Not subscribed to any symbols")
-            return None
         from collections import abc
         if not isinstance(message, abc.Mapping):
             raise ValueError("Malformed message: %s" % message)
+        if "id" in message:
+            error = message.get("error")
+            if error is None and "code" in message:  # <- flat, older form
+                error = dict(code=message["code"], msg=message.get("msg"))
+            self._resolve_reply(message["id"], error)
+            return message
+        if not self.ticker_subscriptions:
+            self.echo("Not subscribed to any symbols")
+            return None
         if "error" in message:
             self.echo(message["error"], level=3)
             return message["error"]
@@ -192,8 +233,9 @@ class BinanceClient(ExchangeClient):
         data = message["data"]
         # self.echo("New - sym: %r, stream_type: %r" % (sym, stream_type))
         assert data["s"] == sym
-        assert sym in self.ticker_subscriptions
-        self.ticker.setdefault(sym, {})
+        if sym not in self.ticker_subscriptions:
+            return None  # <- stragglers arriving before ``UNSUBSCRIBE`` acked
+        record = self.get_record(sym)
         if stream_type == "ticker":
             # Binance's ``data["p"]`` is the plain algebraic change (diff btwn
             # open and last). Better to just send percent and later divide by
@@ -202,86 +244,84 @@ class BinanceClient(ExchangeClient):
             # TODO verify bid/ask prices match exchange website. Would be nice
             # to avoid subscribing to the orderbook entirely. Easiest to check
             # with low-volume pairs
-            self.ticker[sym].update(dict(
-                sym=data["s"],
-                chgP=data["P"],
-                bid=data["b"],
-                ask=data["a"],
-                open=data["o"],
-                volB=data["v"],
-                volQ=data["q"],
-                time=data["E"]
-            ))
+            pdp = record.pdp
+            record.chgP = float(data["P"])
+            record.bid = parse_scaled(data["b"], pdp)
+            record.ask = parse_scaled(data["a"], pdp)
+            record.open = parse_scaled(data["o"], pdp)
+            record.volB = parse_scaled(data["v"], record.qdp)
+            record.volQ = parse_scaled(data["q"], pdp)
+            record.time = data["E"] / 1000
         elif stream_type == "aggTrade":
             # self.echo("Updating last price for %r to %r" % (sym, data["p"]))
-            self.ticker[sym].update({"last": data["p"], "time": data["E"]})
+            record.last = parse_scaled(data["p"], record.pdp)
+            record.time = data["E"] / 1000
+        self.mark_dirty(sym)
         return None
 
-    async def get_symbols(self, symbol=None):
+    async def fetch_symbols(self):
         """
         This uses a normal http GET request via the REST API
         TODO: add native keys and example values here
         """
-        if self.symbols is None:
-            import json
-            import urllib.request
-            from urllib.error import HTTPError
-            url = "".join((self.rest["base"], self.rest["symbols"]))
-            try:
-                with urllib.request.urlopen(url) as f:
-                    data = json.load(f)
-            except HTTPError as e:
-                raise ConnectionError("Problem connecting to %s" % url)
-            if "error" in data:
-                raise ConnectionError(data["error"])
-            self.symbols = {
-                s["symbol"]: dict(curB=s[self.trans.curB],
-                                  curQ=s[self.trans.curQ],
-                                  tick=next(d[self.trans.tick].rstrip("0") for
-                                            d in s["filters"] if
-                                            self.trans.tick in d))
-                for s in data["symbols"]
-            }
-            self.markets = {v["curQ"] for v in self.symbols.values()}
-            if "123456" in self.symbols:
-                del self.symbols["123456"]
-            self.markets.discard("456")
-        if symbol is None:
-            return list(self.symbols.values())
-        else:
-            return self.symbols[symbol]
-
-    async def do_poll(self, symbol, key):
-        while key not in self.ticker.get(symbol, {}):
-            await asyncio.sleep(0.01)
+        data = await self.get_rest("symbols")
+        if "error" in data:
+            raise ConnectionError(data["error"])
+        symbols = {
+            s["symbol"]: dict(curB=s[self.trans.curB],
+                              curQ=s[self.trans.curQ],
+                              tick=next(d[self.trans.tick].rstrip("0") for
+                                        d in s["filters"] if
+                                        self.trans.tick in d),
+                              step=next((d[self.trans.step].rstrip("0") for
+                                         d in s["filters"] if
+                                         self.trans.step in d), None))
+            for s in data["symbols"]
+        }
+        symbols.pop("123456", None)  # <- bogus "456" market
+        return symbols
 
     async def subscribe_agg_trade(self, symbol):
+        """
+        Only queues the stream. The caller is responsible for awaiting
+        ``self._sync_streams()``.
+        """
         assert symbol in self.ticker_subscriptions
-        stream_name = "%s@aggTrade" % symbol.lower()
-        self.streams.add(stream_name)
-        # This is destined for ``asyncio.wait()``, so no need to wrap in Task
-        return self.do_poll(symbol, "last")
+        self._queue_streams("%s@aggTrade" % symbol.lower())
+        # This is destined for ``asyncio.wait()``
+        return self.wait_for_key(symbol, "last")
 
     async def unsubscribe_agg_trade(self, symbol):
         assert symbol not in self.ticker_subscriptions
-        stream_name = "%s@aggTrade" % symbol.lower()
-        self.streams.discard(stream_name)
+        self._queue_streams("%s@aggTrade" % symbol.lower(), subscribe=False)
 
     async def subscribe_ticker(self, symbol):
         if symbol in self.ticker_subscriptions:
             self.echo("Already subscribed to %r" % symbol, level=4)
             return None
         self.ticker_subscriptions.add(symbol)
-        stream_name = "%s@ticker" % symbol.lower()
-        self.streams.add(stream_name)
+        self.start_clock(symbol)
+        names = ("%s@ticker" % symbol.lower(), "%s@aggTrade" % symbol.lower())
+        self._queue_streams(names[0])
         start_trade = await self.subscribe_agg_trade(symbol)
-        await self._reload()
-        start_ticker = self.do_poll(symbol, "chgP")
+        failed = await self._sync_streams()
+        errors = {n: failed[n] for n in names if n in failed}
+        if errors:
+            # Otherwise, we'd wait forever on keys that'll never arrive
+            self.ticker_subscriptions.discard(symbol)
+            self.subscribed_at.pop(symbol, None)
+            for fut in self.key_waiters.pop(symbol, {}).values():
+                fut.cancel()
+            self._queue_streams(*names, subscribe=False)  # <- if either took
+            await self._sync_streams()
+            return "Couldn't subscribe to %r: %r" % (symbol, errors)
+        start_ticker = self.wait_for_key(symbol, "chgP")
         #
         if self.prepop_Task and self.prepop_Task.done():
             prepop = self.prepop_Task.result()
             if prepop.get(symbol) is not None:
-                self.ticker.setdefault(symbol, {}).update(prepop[symbol])
+                self.get_record(symbol).update(prepop[symbol])
+                self.mark_dirty(symbol, fresh=False)
         #
         await asyncio.wait((start_trade, start_ticker))
         if self.verbose:
@@ -293,15 +333,14 @@ class BinanceClient(ExchangeClient):
             self.echo("Already unsubscribed from %r" % symbol, level=4)
             return None
         self.ticker_subscriptions.discard(symbol)
-        stream_name = "%s@ticker" % symbol.lower()
-        self.streams.discard(stream_name)
+        self.subscribed_at.pop(symbol, None)
+        self._queue_streams("%s@ticker" % symbol.lower(), subscribe=False)
         await self.unsubscribe_agg_trade(symbol)
-        await self._reload()
+        await self._sync_streams()
         return "Unsubscribed from %r" % symbol
 
-    def make_date(self, timestamp):
-        from datetime import datetime
-        return datetime.utcfromtimestamp(timestamp/1000)
+    def parse_time(self, timestamp):
+        return timestamp / 1000
 
 
 async def main(**kwargs):
@@ -321,16 +360,15 @@ async def main(**kwargs):
         #
         futs += await asyncio.gather(*map(client.subscribe_ticker,
                                           my_symbols))
-        futs.append({s: client.ticker[s] for s in my_symbols})
+        futs.append({s: client.ticker[s].as_dict() for s in my_symbols})
         #
         # Move these to tests
         assert not any(True for v in client.symbols.values() if
                        v["curQ"] == "456")
-        from datetime import timedelta, datetime
-        now = datetime.utcnow()
+        from time import time
+        now = time()
         for sym in my_symbols:
-            ts = client.make_date(client.ticker[sym]["time"])
-            assert now - ts < timedelta(0, 2)
+            assert now - client.ticker[sym].time < 2
         #
         futs += await asyncio.gather(*map(client.unsubscribe_ticker,
                                           my_symbols))
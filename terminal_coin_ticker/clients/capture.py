@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Raw websocket traffic, captured to an append-only session log.
+
+A capture starts with ``MAGIC``, after which each frame is a record
+header (``RECORD``: arrival time in epoch seconds, direction, payload
+length) followed by the payload as UTF-8 bytes. Directions are ``<``
+for received, ``>`` for sent, ``$`` for REST replies (the URL, a
+newline, then the body) and ``#`` for notes, like the URL of each
+connection. Files ending in ``.gz`` or ``.zst`` are compressed, each
+session appending its own gzip member or zstd frame, both of which
+decompress as one stream. Zstandard needs Python 3.14+ or the
+zstandard module.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import json
+import os
+import struct
+
+from time import time
+
+MAGIC = b"TCTCAP1\n"
+RECORD = struct.Struct("<dcI")
+FLUSH_INTERVAL = 1.0  # Seconds, at most, before written frames hit disk
+
+
+def open_capture(path, mode="rb"):
+    """
+    Open ``path`` for binary reading or appending, (de)compressing by
+    extension
+    """
+    if path.endswith(".gz"):
+        import gzip
+        return gzip.open(path, mode)
+    if not path.endswith(".zst"):
+        return open(path, mode)
+    try:
+        from compression import zstd
+    except ImportError:
+        pass
+    else:
+        return zstd.open(path, mode)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Need Python 3.14+ or the zstandard module to "
+                          "use .zst captures")
+    if "r" in mode:
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, mode), read_across_frames=True
+        )
+    return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+
+
+class FrameRecorder:
+    """
+    Call ``received()`` and ``sent()`` with each raw frame, ``str`` or
+    ``bytes``, and ``close()`` when done. Those only timestamp the frame
+    and queue it, so the receive path never waits on encoding,
+    compression or disk. A daemon thread does the rest, in batches. If
+    it fails, the exception is kept as ``error``, nothing more is queued
+    and ``close()`` returns it.
+    """
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        import queue
+        import threading
+        self.path = path
+        self.flush_interval = flush_interval
+        fresh = not os.path.exists(path) or not os.path.getsize(path)
+        self.file = open_capture(path, "ab")  # <- fail early if bad path
+        if fresh:
+            self.file.write(MAGIC)
+        self.queue = queue.SimpleQueue()
+        self.frames = 0
+        self.bytes_written = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name="capture")
+        self.thread.start()
+
+    def received(self, frame):
+        if self.error is None:
+            self.queue.put((time(), b"<", frame))
+
+    def sent(self, frame):
+        if self.error is None:
+            self.queue.put((time(), b">", frame))
+
+    def note(self, text):
+        if self.error is None:
+            self.queue.put((time(), b"#", text))
+
+    def fetched(self, url, data):
+        """Record ``data``, the decoded body of a REST reply"""
+        if self.error is None:
+            self.queue.put((time(), b"$", (url, data)))
+
+    def _run(self):
+        from queue import Empty
+        try:
+            self._write_batches()
+        except Exception as exc:  # <- disk full, unserializable body, etc.
+            self.error = exc
+            while True:  # <- drop what's queued, it'll never be written
+                try:
+                    self.queue.get(block=False)
+                except Empty:
+                    break
+        finally:
+            try:
+                self.file.close()
+            except Exception as exc:
+                self.error = self.error or exc
+
+    def _write_batches(self):
+        from queue import Empty
+        from time import monotonic
+        get, pack, write = self.queue.get, RECORD.pack, self.file.write
+        flushed = monotonic()
+        done = False
+        while not done:
+            try:
+                batch = [get(timeout=self.flush_interval)]
+            except Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(get(block=False))
+                except Empty:
+                    break
+            if None in batch:
+                del batch[batch.index(None):]
+                done = True
+            for stamp, direction, frame in batch:
+                if direction == b"$":
+                    frame = "%s\n%s" % (frame[0], json.dumps(frame[1]))
+                if isinstance(frame, str):
+                    frame = frame.encode()
+                write(pack(stamp, direction, len(frame)))
+                write(frame)
+                self.bytes_written += RECORD.size + len(frame)
+            self.frames += len(batch)
+            if done or monotonic() - flushed >= self.flush_interval:
+                self.file.flush()
+                flushed = monotonic()
+
+    def close(self):
+        """
+        Write out everything queued so far and close the file. Returns
+        the writer's exception, if it died, else None.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        return self.error
+
+
+def iter_capture(path):
+    """
+    Yield ``(stamp, direction, payload)`` for each frame in ``path``,
+    payloads as ``bytes``. Raises ``ValueError`` if the file isn't a
+    capture. A truncated last frame, as left by a crash, is dropped.
+    """
+    with open_capture(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a capture: %s" % path)
+        read, unpack, size = f.read, RECORD.unpack, RECORD.size
+        while True:
+            try:
+                head = read(size)
+                if len(head) < size:
+                    return
+                stamp, direction, length = unpack(head)
+                payload = read(length)
+            except EOFError:  # <- compressed stream cut short
+                return
+            if len(payload) < length:
+                return
+            yield stamp, direction, payload
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of each exchange's symbols, markets and the lookup tables
+derived from them. Catalogs live in ``$XDG_CACHE_HOME/terminal-coin-ticker``
+as one JSON file per exchange and are ignored when their ``version``
+doesn't match ``CATALOG_VERSION``.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import json
+import os
+
+CATALOG_VERSION = 1
+CATALOG_TTL = 24 * 60 * 60  # Seconds before a catalog is refreshed
+
+
+def get_cache_dir():
+    base = (os.getenv("XDG_CACHE_HOME") or
+            os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "terminal-coin-ticker")
+
+
+def get_catalog_path(exchange):
+    return os.path.join(get_cache_dir(), "%s.json" % exchange.lower())
+
+
+def build_aliases(symbols):
+    """
+    Map every accepted spelling, minus separators and uppercased, to its
+    symbol. Native ids win over base/quote concatenations, which aren't
+    always the same thing. Missing USD pairs fall back to USDT ones.
+
+    >>> sorted(build_aliases({
+    ...     "BXTUSDT": dict(curB="BXT", curQ="USD"),
+    ...     "ETHUSD": dict(curB="ETH", curQ="USD"),
+    ...     "ETHUSDT": dict(curB="ETH", curQ="USDT"),
+    ... }).items())  # doctest: +NORMALIZE_WHITESPACE
+    [('BXTUSD', 'BXTUSDT'), ('BXTUSDT', 'BXTUSDT'),
+     ('ETHUSD', 'ETHUSD'), ('ETHUSDT', 'ETHUSDT')]
+    """
+    aliases = {}
+    for sym, info in symbols.items():
+        aliases["".join((info["curB"], info["curQ"])).upper()] = sym
+    for sym in symbols:
+        aliases[sym.upper()] = sym
+    for alias, sym in list(aliases.items()):
+        if alias.endswith("USDT"):
+            aliases.setdefault(alias[:-1], sym)
+    return aliases
+
+
+def build_conversions(symbols, markets):
+    """
+    Symbols pairing two quote currencies, e.g., ETHBTC or BTCUSDT.
+    """
+    from itertools import permutations
+    all_convs = {"".join(p) for p in permutations(markets, 2)}
+    return all_convs & symbols.keys()
+
+
+def make_catalog(exchange, symbols):
+    from time import time
+    markets = {v["curQ"] for v in symbols.values()}
+    return dict(version=CATALOG_VERSION,
+                exchange=exchange,
+                saved=time(),
+                symbols=symbols,
+                markets=sorted(markets),
+                conversions=sorted(build_conversions(symbols, markets)),
+                aliases=build_aliases(symbols))
+
+
+def load_catalog(exchange):
+    """
+    Return the saved catalog or None if it's missing, unreadable or
+    from a different version.
+    """
+    try:
+        with open(get_catalog_path(exchange)) as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(catalog, dict) or
+            catalog.get("version") != CATALOG_VERSION or
+            catalog.get("exchange") != exchange):
+        return None
+    return catalog
+
+
+def save_catalog(catalog):
+    """
+    Write atomically, so concurrent instances never see half a file.
+    Returns the path or None if the cache dir isn't writable.
+    """
+    path = get_catalog_path(catalog["exchange"])
+    temp = "%s.%d" % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp, "w") as f:
+            json.dump(catalog, f, separators=(",", ":"))
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        return None
+    return path
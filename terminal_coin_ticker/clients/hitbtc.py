@@ -9,14 +9,13 @@ API docs_ and interactive explorer_:
 # This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
 
 import asyncio
-import json
-import sys
 
 from terminal_coin_ticker import (
-    add_async_sig_handlers, remove_async_sig_handlers, ppj
+    add_async_sig_handlers, remove_async_sig_handlers, ppj, parse_scaled,
+    iso8601_to_epoch
 )
 from terminal_coin_ticker.clients import (
-    USE_AIOHTTP, Transmap, make_truecolor_palette, ExchangeClient
+    USE_AIOHTTP, Transmap, ExchangeClient
 )
 
 VERBOSITY = 6
@@ -34,9 +33,14 @@ tmap = Transmap(
     chgP=None,
     curB="baseCurrency",
     curQ="quoteCurrency",
-    tick="tickSize"
+    tick="tickSize",
+    step="quantityIncrement"
 )
 
+# Deltas complicate this key translation business
+note_keys = tuple((k, getattr(tmap, k)) for k in
+                  ("time", "volB", "volQ", "last", "open", "ask", "bid"))
+
 errors_reference = {
     403:    (401, "Action is forbidden for account"),
     429:    (429, "Too many requests. Action is being rate limited for "
@@ -91,9 +95,6 @@ foreground = {
     "head_alt":     "#507691"
 }
 
-truecolor_bg = make_truecolor_palette("background", **background)
-truecolor_fg = make_truecolor_palette("foreground", **foreground)
-
 
 class HitBTCClient(ExchangeClient):
     exchange = "HitBTC"
@@ -104,33 +105,8 @@ class HitBTCClient(ExchangeClient):
         "symbols": "/public/symbol"  # unused, has native ws variant
     }
     trans = tmap
-    background_24 = truecolor_bg
-    foreground_24 = truecolor_fg
-
-    def __init__(self, verbosity=VERBOSITY, logfile=None,
-                 use_aiohttp=USE_AIOHTTP):
-        """
-        Neither the jsonrpc spec nor the api docs mention max size for
-        ``id``. If they did, it'd probably be better to catch
-        ``StopIteration`` and remake the ws connection when approaching
-        this limit. Or, if the server resets its cache at that point,
-        use ``itertools.cycle`` and keep on going. If the server simply
-        forgets the ids of fulfilled requests and/or overwrites
-        duplicates, then this is pointless.
-        .. _: http://www.jsonrpc.org/specification
-        """
-        self.rqids = iter(range(1, sys.maxsize))
-        self.replies = {}
-        super().__init__(verbosity, logfile, use_aiohttp)
-
-    def prep_request(self, method, payload, rqid=None):
-        # Can also use channel variant, e.g.:
-        #   {channel: 'ticker', event: 'unsub', params:{symbol: pair}}
-        if rqid is None:
-            rqid = next(self.rqids)
-        outdict = dict(method=method, params=payload, id=rqid)
-        # No need for bytes
-        return rqid, json.dumps(outdict)
+    background_hex = background
+    foreground_hex = foreground
 
     async def consume_response(self, message):
         if "error" in message:
@@ -141,13 +117,13 @@ class HitBTCClient(ExchangeClient):
             if code in errors_reference:
                 message["error"].update(zip("status docs".split(),
                                             errors_reference[code]))
+            if message.get("id") is not None:
+                self._resolve_reply(message["id"], message["error"])
             return message["error"]
         rqid = message.get("id")
         if rqid is None:
             return
-        rqid = int(rqid)
-        result = message.get("result", message.get("error"))
-        self.replies.update({rqid: result})
+        self._resolve_reply(rqid, message.get("result"))
 
     async def consume_ticker_notes(self, message):
         """
@@ -166,55 +142,48 @@ class HitBTCClient(ExchangeClient):
         if message.get("method", message.get("channel")) != "ticker":
             return None
         new_data = message.get("params", message.get("data"))
-        existing = self.ticker.setdefault(new_data["symbol"], {})
-        # Deltas complicate this key translation business
-        keys = ("time", "volB", "volQ", "last", "open", "ask", "bid")
-        # This'll fail if any json vals arrive as non-quoted zeros.
-        from operator import itemgetter
-        tr = self.trans._asdict()
-        filtered = filter(itemgetter(1),
-                          ((k, new_data.get(tr[k])) for k in keys))
-        # In which case should replace with::
-        #
-        #     lambda item: item[1] is not None
-        #
-        existing.update(dict(filtered))
+        existing = self.get_record(new_data["symbol"])
+        get = new_data.get
+        # This'll fail if any json vals arrive as non-quoted zeros, in which
+        # case should test ``value is not None``
+        for key, native in note_keys:
+            value = get(native)
+            if not value:
+                continue
+            if key == "time":
+                value = iso8601_to_epoch(value)
+            else:
+                value = parse_scaled(value, existing.qdp if key == "volB" else
+                                     existing.pdp)
+            setattr(existing, key, value)
+        self.mark_dirty(new_data["symbol"])
         return existing
 
-    async def check_replies(self, rqid):
-        while rqid not in self.replies:
-            await asyncio.sleep(0.1)
-        result = self.replies[rqid]
-        del self.replies[rqid]
-        return result
-
-    async def get_symbols(self, symbol=None):
-        if self.symbols is None:
-            rqid, message = self.prep_request("getSymbols", {})
-            await self.do_send(message)
-            result = await self.check_replies(rqid)
-            self.symbols = {s["id"]: dict(curB=s[self.trans.curB],
-                                          curQ=s[self.trans.curQ],
-                                          tick=s[self.trans.tick])
-                            for s in result}
-            self.markets = {v["curQ"] for v in self.symbols.values()}
-        if symbol is None:
-            return list(self.symbols.values())
-        else:
-            return self.symbols[symbol]
+    async def fetch_symbols(self):
+        rqid, message = self.prep_request("getSymbols", {})
+        await self.do_send(message, rqid)
+        result = await self.check_replies(rqid)
+        return {s["id"]: dict(curB=s[self.trans.curB],
+                              curQ=s[self.trans.curQ],
+                              tick=s[self.trans.tick],
+                              step=s[self.trans.step])
+                for s in result}
 
     async def subscribe_ticker(self, symbol):
         if symbol in self.ticker_subscriptions:
             self.echo("Already subscribed to %r" % symbol, level=4)
             return None
+        # Can also use channel variant, e.g.:
+        #   {channel: 'ticker', event: 'unsub', params:{symbol: pair}}
         payload = {"symbol": symbol}
         rqid, message = self.prep_request("subscribeTicker", payload)
         if self.verbose:
             self.echo("adding %s to ticker_sub...s for id %d" %
                       (symbol, rqid))
         self.ticker_subscriptions.add(symbol)
+        self.start_clock(symbol)
         await self.add_consumer(self.consume_ticker_notes, 5)
-        await self.do_send(message)
+        await self.do_send(message, rqid)
         result = await self.check_replies(rqid)
         return ("subscribe_ticker(%r) exited" % symbol, result)
 
@@ -224,16 +193,14 @@ class HitBTCClient(ExchangeClient):
             return None
         payload = {"symbol": symbol}
         rqid, message = self.prep_request("unsubscribeTicker", payload)
-        await self.do_send(message)
+        await self.do_send(message, rqid)
         result = await self.check_replies(rqid)
         self.ticker_subscriptions.discard(symbol)
+        self.subscribed_at.pop(symbol, None)
         return ("unsubscribe_ticker(%r) exited" % symbol, result)
 
-    def make_date(self, timestamp):
-        fmt = "%Y-%m-%dT%H:%M:%S.%fZ"
-        from datetime import datetime
-        dts = datetime.strptime(timestamp, fmt)
-        return dts
+    def parse_time(self, timestamp):
+        return iso8601_to_epoch(timestamp)
 
 
 async def main():
@@ -253,7 +220,7 @@ async def main():
         futs += await asyncio.gather(*map(client.unsubscribe_ticker,
                                           my_symbols))
         client.echo("All done...")
-        ppj(client.ticker)
+        ppj({k: v.as_dict() for k, v in client.ticker.items()})
     futs.append(client.active_recv_Task.result())
     return dict(futs=futs)
 
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-ins for the exchanges, speaking just the parts of each
+protocol the clients use, with synthetic markets in place of real ones.
+Meant for load-testing clients at rates no live service will provide.
+
+To point a client at one::
+
+    async with HitBTCMock(num_symbols=200, rate=5000) as mock:
+        async with mock.patch(HitBTCClient()) as client:
+            ...
+
+Or run one standalone with ``python -m terminal_coin_ticker.clients.mock
+[hitbtc|binance]``, configured by the env vars ``NUM_SYMBOLS``,
+``RATE`` (messages per second per connection), ``PORT`` and
+``REST_PORT``. Needs the websockets module, even when clients use
+aiohttp.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import asyncio
+import json
+import random
+
+from time import time, gmtime, strftime
+
+from terminal_coin_ticker import places_of
+
+NUM_SYMBOLS = 50
+RATE = 100          # Messages per second, per connection
+PUMP_INTERVAL = 0.01
+
+
+class MarketSim:
+    """
+    Prices taking a random walk. There are always conversion pairs
+    between the three markets, the rest being made-up base currencies
+    paired with each in turn, till ``num_symbols`` is reached.
+    """
+    def __init__(self, num_symbols=NUM_SYMBOLS, usd="USD", seed=None):
+        self.random = random.Random(seed)
+        self.usd = usd
+        markets = ("BTC", "ETH", usd)
+        ticks = {"BTC": "0.000001", "ETH": "0.00001", usd: "0.01"}
+        pairs = [("ETH", "BTC"), ("BTC", usd), ("ETH", usd)]
+        num = 0
+        while len(pairs) < num_symbols:
+            base = "X%s%s" % (chr(65 + num // 26 % 26), chr(65 + num % 26))
+            pairs.extend((base, m) for m in markets)
+            num += 1
+        self.symbols = {}  # <- sym: info
+        self.state = {}  # <- sym: dict of floats
+        usd_price = {"BTC": 10000.0, "ETH": 500.0, usd: 1.0}
+        for base, quote in pairs[:num_symbols]:
+            sym = base + quote
+            tick = ticks[quote]
+            if base in usd_price:
+                price = usd_price[base] / usd_price[quote]
+            else:
+                price = self.random.uniform(0.1, 100) / usd_price[quote]
+            self.symbols[sym] = dict(base=base, quote=quote, tick=tick,
+                                     places=places_of(tick))
+            volume = self.random.uniform(1e3, 1e6)
+            self.state[sym] = dict(last=price, open=price, low=price,
+                                   high=price, volume=volume,
+                                   trades=0, time=time())
+
+    def step(self, sym):
+        """Move ``sym`` a tick or so and return its state"""
+        state = self.state[sym]
+        price = state["last"] * self.random.uniform(0.998, 1.002)
+        state["last"] = price
+        state["low"] = min(state["low"], price)
+        state["high"] = max(state["high"], price)
+        state["volume"] += self.random.uniform(0, 10)
+        state["trades"] += 1
+        state["time"] = time()
+        return state
+
+    def fmt(self, sym, value):
+        return "%.*f" % (self.symbols[sym]["places"], value)
+
+
+class MockExchange:
+    """
+    A websocket server and a plain HTTP one for REST, both on loopback.
+    Subclasses supply ``serve()``, the per-connection protocol, and
+    ``routes``, REST paths mapped to method names.
+    """
+    exchange = None
+    usd = "USD"
+    rest_path = ""
+    routes = {}
+
+    def __init__(self, num_symbols=NUM_SYMBOLS, rate=RATE, seed=None,
+                 host="127.0.0.1"):
+        self.sim = MarketSim(num_symbols, self.usd, seed)
+        self.rate = rate
+        self.host = host
+        self.url = self.rest_base = None
+        self.sent = 0  # <- websocket messages, all connections
+        self._servers = []
+
+    async def start(self, port=0, rest_port=0):
+        import websockets
+        # No permessage-deflate, which would cost the server more than
+        # it saves on loopback
+        server = await websockets.serve(self._handle_ws, self.host, port,
+                                        compression=None)
+        self._servers.append(server)
+        port = server.sockets[0].getsockname()[1]
+        self.url = "ws://%s:%d" % (self.host, port)
+        server = await asyncio.start_server(self._handle_http, self.host,
+                                            rest_port)
+        self._servers.append(server)
+        rest_port = server.sockets[0].getsockname()[1]
+        self.rest_base = "http://%s:%d%s" % (self.host, rest_port,
+                                             self.rest_path)
+        return self
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers.clear()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def patch(self, client):
+        """
+        Point ``client`` at this server and return it. Its symbols are
+        always fetched, so the real catalog is neither read nor saved.
+        """
+        client.url = self.url
+        client.rest = dict(client.rest, base=self.rest_base)
+        client.catalog_ttl = 0
+        return client
+
+    async def _handle_ws(self, ws, path=None):
+        # Older websockets pass the path, newer ones hang it on a request
+        if path is None:
+            path = getattr(ws, "path", None) or ws.request.path
+        import websockets
+        try:
+            await self.serve(ws, path)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def serve(self, ws, path):
+        raise NotImplementedError
+
+    async def pump(self, ws, subs, make):
+        """
+        Send ``make(sym)`` for random members of ``subs`` at ``self.rate``
+        per second, in batches every ``PUMP_INTERVAL``
+        """
+        loop = asyncio.get_event_loop()
+        budget = 0.0
+        then = loop.time()
+        choice = self.sim.random.choice
+        while True:
+            await asyncio.sleep(PUMP_INTERVAL)
+            now = loop.time()
+            budget += (now - then) * self.rate
+            then = now
+            num = int(budget)
+            budget -= num
+            if not subs:
+                continue
+            pool = sorted(subs)
+            for __ in range(num):
+                await ws.send(make(choice(pool)))
+            self.sent += num
+
+    async def _handle_http(self, reader, writer):
+        """
+        Just enough HTTP/1.1 for keep-alive GETs with no bodies
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, __ = line.decode("latin-1").split(" ", 2)
+                while (await reader.readline()).strip():
+                    pass  # <- headers
+                name = self.routes.get(target.partition("?")[0])
+                if method != "GET" or name is None:
+                    status, body = "404 Not Found", {"error": "Not found"}
+                else:
+                    status, body = "200 OK", getattr(self, name)()
+                body = json.dumps(body).encode()
+                writer.write(b"HTTP/1.1 %s\r\n"
+                             b"Content-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" %
+                             (status.encode(), len(body)))
+                writer.write(body)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def _iso(stamp):
+    return "%s.%03dZ" % (strftime("%Y-%m-%dT%H:%M:%S", gmtime(stamp)),
+                         stamp % 1 * 1000)
+
+
+class HitBTCMock(MockExchange):
+    """
+    JSON-RPC over one connection: ``getSymbols``, ``subscribeTicker``
+    and ``unsubscribeTicker``, plus ``ticker`` notifications. REST has
+    the symbol and ticker lists.
+    """
+    exchange = "HitBTC"
+    rest_path = "/api/2"
+    routes = {"/api/2/public/ticker": "get_ticker",
+              "/api/2/public/symbol": "get_symbols"}
+
+    def get_symbols(self):
+        return [dict(id=sym, baseCurrency=info["base"],
+                     quoteCurrency=info["quote"], quantityIncrement="0.001",
+                     tickSize=info["tick"], takeLiquidityRate="0.001",
+                     provideLiquidityRate="-0.0001",
+                     feeCurrency=info["quote"])
+                for sym, info in self.sim.symbols.items()]
+
+    def ticker(self, sym, state):
+        fmt = self.sim.fmt
+        last = state["last"]
+        return dict(ask=fmt(sym, last * 1.0005), bid=fmt(sym, last * 0.9995),
+                    last=fmt(sym, last), open=fmt(sym, state["open"]),
+                    low=fmt(sym, state["low"]), high=fmt(sym, state["high"]),
+                    volume="%.3f" % state["volume"],
+                    volumeQuote=fmt(sym, state["volume"] * last),
+                    timestamp=_iso(state["time"]), symbol=sym)
+
+    def get_ticker(self):
+        return [self.ticker(sym, state) for
+                sym, state in self.sim.state.items()]
+
+    def note(self, sym):
+        return json.dumps(dict(jsonrpc="2.0", method="ticker",
+                               params=self.ticker(sym, self.sim.step(sym))))
+
+    async def serve(self, ws, path):
+        subs = set()
+        pump = asyncio.ensure_future(self.pump(ws, subs, self.note))
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                method = request.get("method")
+                params = request.get("params") or {}
+                reply = dict(jsonrpc="2.0", id=request.get("id"))
+                if method == "getSymbols":
+                    reply["result"] = self.get_symbols()
+                elif (method in ("subscribeTicker", "unsubscribeTicker") and
+                        params.get("symbol") in self.sim.symbols):
+                    if method == "subscribeTicker":
+                        subs.add(params["symbol"])
+                    else:
+                        subs.discard(params["symbol"])
+                    reply["result"] = True
+                else:
+                    reply["error"] = dict(code=2001, message="Symbol not found"
+                                          if "symbol" in params else
+                                          "Method not found")
+                await ws.send(json.dumps(reply))
+        finally:
+            pump.cancel()
+
+
+class BinanceMock(MockExchange):
+    """
+    Combined streams (``/stream?streams=...``) of ``@ticker`` and
+    ``@aggTrade`` payloads, changed with ``SUBSCRIBE``/``UNSUBSCRIBE``.
+    ``trade_ratio`` is the share of messages that are trades. REST has
+    ``/ticker/24hr`` and ``/exchangeInfo``.
+    """
+    exchange = "Binance"
+    usd = "USDT"
+    rest_path = "/api/v1"
+    routes = {"/api/v1/ticker/24hr": "get_ticker",
+              "/api/v1/exchangeInfo": "get_exchange_info"}
+
+    def __init__(self, *args, trade_ratio=0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trade_ratio = trade_ratio
+
+    def get_exchange_info(self):
+        return dict(timezone="UTC", serverTime=int(time() * 1000), symbols=[
+            dict(symbol=sym, status="TRADING", baseAsset=info["base"],
+                 quoteAsset=info["quote"], filters=[
+                     dict(filterType="PRICE_FILTER", minPrice=info["tick"],
+                          maxPrice="100000.00000000",
+                          tickSize="%.8f" % float(info["tick"])),
+                     dict(filterType="LOT_SIZE", minQty="0.00100000",
+                          maxQty="100000.00000000", stepSize="0.00100000")
+                 ])
+            for sym, info in self.sim.symbols.items()
+        ])
+
+    def get_ticker(self):
+        fmt = self.sim.fmt
+        out = []
+        for sym, state in self.sim.state.items():
+            last, open_ = state["last"], state["open"]
+            out.append(dict(
+                symbol=sym, priceChange=fmt(sym, last - open_),
+                priceChangePercent="%.3f" % ((last - open_) / open_ * 100),
+                lastPrice=fmt(sym, last), bidPrice=fmt(sym, last * 0.9995),
+                askPrice=fmt(sym, last * 1.0005), openPrice=fmt(sym, open_),
+                volume="%.8f" % state["volume"],
+                quoteVolume="%.8f" % (state["volume"] * last),
+                openTime=int((state["time"] - 86400) * 1000),
+                closeTime=int(state["time"] * 1000), count=state["trades"]
+            ))
+        return out
+
+    def event(self, stream):
+        sym, __, kind = stream.partition("@")
+        sym = sym.upper()
+        state = self.sim.step(sym)
+        fmt = self.sim.fmt
+        last, open_ = state["last"], state["open"]
+        stamp = int(state["time"] * 1000)
+        if kind == "aggTrade":
+            data = dict(e="aggTrade", E=stamp, s=sym, a=state["trades"],
+                        p=fmt(sym, last), q="%.3f" % self.sim.random.random(),
+                        f=state["trades"], l=state["trades"], T=stamp,
+                        m=False, M=True)
+        else:
+            data = dict(e="24hrTicker", E=stamp, s=sym,
+                        p=fmt(sym, last - open_),
+                        P="%.3f" % ((last - open_) / open_ * 100),
+                        c=fmt(sym, last), b=fmt(sym, last * 0.9995),
+                        a=fmt(sym, last * 1.0005), o=fmt(sym, open_),
+                        h=fmt(sym, state["high"]), l=fmt(sym, state["low"]),
+                        v="%.8f" % state["volume"],
+                        q="%.8f" % (state["volume"] * last),
+                        n=state["trades"])
+        return json.dumps(dict(stream=stream, data=data))
+
+    async def serve(self, ws, path):
+        from urllib.parse import urlsplit, parse_qs
+        parts = urlsplit(path)
+        if parts.path != "/stream":
+            await ws.close(1008, "Only combined streams supported")
+            return
+        streams = set()
+        for value in parse_qs(parts.query).get("streams", ()):
+            streams.update(s for s in value.split("/") if s)
+        known = self.sim.symbols
+        streams = {s for s in streams if s.partition("@")[0].upper() in known}
+        trades = {s for s in streams if s.endswith("@aggTrade")}
+        tickers = streams - trades
+        rand = self.sim.random.random
+
+        def make(__):
+            pool = (trades if trades and (not tickers or
+                                          rand() < self.trade_ratio) else
+                    tickers)
+            return self.event(self.sim.random.choice(sorted(pool)))
+
+        pump = asyncio.ensure_future(self.pump(ws, streams, make))
+        try:
+            async for raw in ws:
+                request = json.loads(raw)
+                method = request.get("method")
+                names = request.get("params") or ()
+                if method in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                    for name in names:
+                        if name.partition("@")[0].upper() not in known:
+                            continue
+                        pool = (trades if name.endswith("@aggTrade") else
+                                tickers)
+                        if method == "SUBSCRIBE":
+                            pool.add(name)
+                            streams.add(name)
+                        else:
+                            pool.discard(name)
+                            streams.discard(name)
+                    reply = dict(result=None, id=request.get("id"))
+                else:
+                    reply = dict(error=dict(code=2, msg="Invalid request"),
+                                 id=request.get("id"))
+                await ws.send(json.dumps(reply))
+        finally:
+            pump.cancel()
+
+
+MOCKS = {"hitbtc": HitBTCMock, "binance": BinanceMock}
+
+
+async def main(name):
+    import os
+    Mock = MOCKS[name]
+    mock = Mock(int(os.getenv("NUM_SYMBOLS", NUM_SYMBOLS)),
+                float(os.getenv("RATE", RATE)))
+    await mock.start(int(os.getenv("PORT", 0)),
+                     int(os.getenv("REST_PORT", 0)))
+    print("%s mock: %s (REST %s), %d symbols at %g msg/s" %
+          (mock.exchange, mock.url, mock.rest_base, len(mock.sim.symbols),
+           mock.rate), flush=True)
+    try:
+        await asyncio.Future()
+    finally:
+        await mock.stop()
+
+
+if __name__ == "__main__":
+    import sys
+    name = sys.argv[1].lower() if len(sys.argv) > 1 else "hitbtc"
+    if name not in MOCKS:
+        raise SystemExit("Unknown exchange %r, try one of %s" %
+                         (name, ", ".join(MOCKS)))
+    try:
+        asyncio.get_event_loop().run_until_complete(main(name))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Playback of sessions captured with ``CAPTURE`` (see ``capture.py``),
+standing in for the websocket connection, so everything downstream of
+``recv_handler`` can be profiled or regression-tested offline.
+
+Requests aren't replayed blindly. Each one the client sends is matched,
+``id`` aside, to the earliest unused recorded request with the same
+method and params, and that request's recorded reply goes out right
+away, relabeled with the new ``id``. Everything else (notifications) is
+paced by the capture's timestamps but never runs ahead of the requests
+that preceded it in the recording, so a client that's slow to subscribe
+doesn't miss the start. REST bodies are served from the capture, too.
+Replays are faithful to the extent a run makes the same requests as the
+one captured, which mostly means using the same settings and pairs.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import asyncio
+import json
+
+from collections import deque
+
+from .capture import iter_capture
+
+
+def _request_key(message):
+    return json.dumps({k: v for k, v in message.items() if k != "id"},
+                      sort_keys=True)
+
+
+class ReplaySocket:
+    """
+    Quacks like a ``websockets`` connection and its context manager.
+    ``speed`` is a multiplier, with 0 meaning as fast as possible. With
+    ``as_bytes``, frames come out of ``recv()`` undecoded.
+    """
+    def __init__(self, path, speed=1.0, as_bytes=False):
+        self.path = path
+        self.speed = speed
+        self.as_bytes = as_bytes
+        self.frames = []  # <- (stamp, gate, payload)
+        self.rest = {}  # <- url: body
+        self.requests = {}  # <- request key: deque of indexes
+        replies = {}  # <- recorded request index: reply payload
+        ids = {}  # <- recorded request id: index
+        num_sent = 0
+        for stamp, direction, payload in iter_capture(path):
+            if direction == b">":
+                message = json.loads(payload)
+                self.requests.setdefault(_request_key(message),
+                                         deque()).append(num_sent)
+                ids[message.get("id")] = num_sent
+                num_sent += 1
+            elif direction == b"$":
+                url, __, body = payload.partition(b"\n")
+                self.rest[url.decode()] = body
+            elif direction == b"<":
+                rqid = self._reply_id(payload) if b'"id"' in payload else None
+                if rqid is not None and rqid in ids:
+                    replies[ids[rqid]] = payload
+                    continue
+                # Gate is the number of sends that must happen first
+                self.frames.append((stamp, num_sent, payload))
+        self.replies = replies
+        self.answers = deque()
+        self.pos = 0
+        self.reached = 0  # <- highest gate opened by a matching send
+        self.ref = None  # <- (loop time, capture time) pacing is based on
+        self.first = self.frames[0][0] if self.frames else None
+        self.closed = False
+        self._wakeup = None
+
+    @staticmethod
+    def _reply_id(payload):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return None
+        if (isinstance(message, dict) and
+                ("result" in message or "error" in message)):
+            return message.get("id")
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    def clock(self):
+        """
+        Capture time as of now, in epoch seconds. This keeps running at
+        ``speed`` (or real time, if unlimited) after the last frame.
+        """
+        if self.ref is None:
+            from time import time
+            return time() if self.first is None else self.first
+        ref_t, ref_s = self.ref
+        elapsed = asyncio.get_event_loop().time() - ref_t
+        return ref_s + elapsed * (self.speed or 1)
+
+    async def send(self, message):
+        if self.closed:
+            raise ConnectionError("Replay is closed")
+        message = json.loads(message)
+        pending = self.requests.get(_request_key(message))
+        if not pending:
+            return  # <- never answered, like a lost request
+        index = pending.popleft()
+        self.reached = max(self.reached, index + 1)
+        reply = self.replies.get(index)
+        if reply is not None:
+            reply = json.loads(reply)
+            reply["id"] = message.get("id")
+            self.answers.append(json.dumps(reply))
+        self._wake()
+
+    send_str = send
+
+    def _next_due(self, loop):
+        stamp, gate, payload = self.frames[self.pos]
+        if gate > self.reached:
+            return None
+        if not self.speed:
+            return 0
+        now = loop.time()
+        if self.ref is None:
+            self.ref = (now, stamp)
+        ref_t, ref_s = self.ref
+        due = ref_t + (stamp - ref_s) / self.speed
+        if due < now - 1:  # <- held up by a gate, so don't burst
+            self.ref = (now, stamp)
+            due = now
+        return due - now
+
+    @property
+    def exhausted(self):
+        """All recorded frames have been sent"""
+        return self.pos >= len(self.frames)
+
+    async def recv(self, decode=None):
+        """
+        Return the next frame. Waiting for its turn can be cut short by
+        an answer to a request. Once ``exhausted``, the socket stays
+        open, like a server gone quiet, and only answers requests. It
+        raises ``EOFError`` when closed.
+        """
+        loop = asyncio.get_event_loop()
+        while not self.closed:
+            if self.answers:
+                frame = self.answers.popleft()
+                return (frame.encode() if self.as_bytes or
+                        decode is False else frame)
+            wait = None if self.exhausted else self._next_due(loop)
+            if wait is None or wait > 0:
+                self._wakeup = loop.create_future()
+                try:
+                    await asyncio.wait_for(self._wakeup, wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            stamp, __, frame = self.frames[self.pos]
+            self.pos += 1
+            if not self.speed:
+                self.ref = (loop.time(), stamp)
+                await asyncio.sleep(0)  # <- let other tasks see it
+            return (frame if self.as_bytes or decode is False else
+                    frame.decode())
+        raise EOFError("Replay closed")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except EOFError:
+            raise StopAsyncIteration
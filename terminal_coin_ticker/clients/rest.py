@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Non-blocking REST requests shared by all clients. Uses a single
+aiohttp session when the client's websocket does. Otherwise, requests
+run in a small thread pool, each thread keeping its own keep-alive
+``http.client`` connections. Either way, bodies are gzipped in transit
+and decoded off the event loop.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import asyncio
+import json
+
+TIMEOUT = 20     # Secs per request (aiohttp) or per socket op (http.client)
+MAX_WORKERS = 4
+
+
+class RestSession:
+    """
+    Call ``get_json()`` from coroutines and ``close()`` when done. The
+    aiohttp session is only created on first use, since it wants to be
+    born inside a running loop. ``use_aiohttp`` defaults to whether
+    it's installed.
+    """
+    def __init__(self, loads=json.loads, timeout=TIMEOUT,
+                 max_workers=MAX_WORKERS, use_aiohttp=None):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from importlib.util import find_spec
+        if use_aiohttp is None:
+            use_aiohttp = find_spec("aiohttp") is not None
+        self.aio = use_aiohttp
+        self.loads = loads
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers,
+                                           thread_name_prefix="rest")
+        self._session = None
+        self._local = threading.local()  # <- conns, per worker
+        self._conns = []
+        self.requests = 0
+
+    async def get_json(self, url):
+        """
+        GET ``url`` and return the decoded body. Failures of any kind
+        are raised as ``ConnectionError``.
+        """
+        loop = asyncio.get_event_loop()
+        self.requests += 1
+        if not self.aio:
+            return await loop.run_in_executor(self.executor, self._fetch,
+                                              url, True)
+        body = await self._aio_fetch(url)
+        return await loop.run_in_executor(self.executor, self._decode, body,
+                                          url)
+
+    def _decode(self, body, url):
+        try:
+            return self.loads(body)
+        except ValueError as exc:  # <- truncated, HTML error page, etc.
+            raise ConnectionError("Bad body from %s: %r" % (url, exc))
+
+    async def _aio_fetch(self, url):
+        import aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Accept-Encoding": "gzip"}
+            )
+        try:
+            async with self._session.get(url) as resp:
+                if resp.status >= 400:
+                    raise ConnectionError("Got %d from %s" %
+                                          (resp.status, url))
+                return await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            raise ConnectionError("Problem connecting to %s: %r" %
+                                  (url, exc))
+
+    def _get_conn(self, scheme, netloc):
+        import http.client
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            Conn = (http.client.HTTPSConnection if scheme == "https" else
+                    http.client.HTTPConnection)
+            conn = conns[(scheme, netloc)] = Conn(netloc,
+                                                  timeout=self.timeout)
+            self._conns.append(conn)
+        return conn
+
+    def _fetch(self, url, decode=False, retry=True):
+        """
+        Runs in a worker thread. A kept-alive connection the server has
+        since dropped is retried once on a fresh socket.
+        """
+        import http.client
+        from urllib.parse import urlsplit
+        parts = urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        conn = self._get_conn(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", path or "/",
+                         headers={"Accept-Encoding": "gzip"})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.RemoteDisconnected, BrokenPipeError,
+                ConnectionResetError) as exc:
+            conn.close()
+            if retry:
+                return self._fetch(url, decode, retry=False)
+            raise ConnectionError("Problem connecting to %s: %r" % (url, exc))
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            raise ConnectionError("Problem connecting to %s: %r" % (url, exc))
+        if resp.status >= 400:
+            raise ConnectionError("Got %d from %s" % (resp.status, url))
+        if resp.getheader("Content-Encoding") == "gzip":
+            import gzip
+            try:
+                body = gzip.decompress(body)
+            except (OSError, EOFError) as exc:  # <- BadGzipFile is OSError
+                raise ConnectionError("Bad gzip body from %s: %r" %
+                                      (url, exc))
+        return self._decode(body, url) if decode else body
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        for conn in self._conns:
+            conn.close()
+        self._conns.clear()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Screen-writing helpers for the board. Nothing in here knows about
+exchanges or ticker records; rows arrive as finished strings.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import os
+import sys
+
+
+def query_cursor_row(fd_in=None, fd_out=None, timeout=0.5):
+    """
+    Ask the terminal where the cursor is (DSR 6) and return its 1-based
+    row, or None if either fd isn't a tty or the reply never comes.
+    """
+    if fd_in is None:
+        try:
+            fd_in = sys.stdin.fileno()
+        except (AttributeError, ValueError):
+            return None
+    if fd_out is None:
+        fd_out = sys.stdout.fileno()
+    if not (os.isatty(fd_in) and os.isatty(fd_out)):
+        return None
+    import re
+    import select
+    import termios
+    old = termios.tcgetattr(fd_in)
+    new = termios.tcgetattr(fd_in)
+    new[3] &= ~(termios.ICANON | termios.ECHO)
+    buf = b""
+    try:
+        termios.tcsetattr(fd_in, termios.TCSANOW, new)
+        os.write(fd_out, b"\x1b[6n")
+        while not buf.endswith(b"R"):
+            ready, __, __ = select.select([fd_in], [], [], timeout)
+            if not ready:
+                return None
+            buf += os.read(fd_in, 32)
+    finally:
+        termios.tcsetattr(fd_in, termios.TCSADRAIN, old)
+    match = re.search(rb"\x1b\[(\d+);(\d+)R", buf)
+    return int(match.group(1)) if match else None
+
+
+class Compositor:
+    """
+    Collects pending row updates and writes them as a single frame.
+
+    Rows are numbered like ``TickerLine.lnum``, from the bottom of the
+    board up. ``anchor()`` must be called with the cursor parked at the
+    end of the bottom row, which is where it's returned after every
+    frame. When the terminal reports the cursor's position, rows are
+    addressed absolutely (``CUP``). Otherwise, they're reached by moving
+    up from the saved cursor.
+    """
+    def __init__(self, fd=None):
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.bottom = None
+        self.pending = {}
+        self.frames = 0
+        self.bytes_written = 0
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+        self.bytes_written += len(data)
+
+    def anchor(self, query=True):
+        sys.stdout.flush()
+        self.bottom = query_cursor_row(fd_out=self.fd) if query else None
+        self._write(b"\x1b7")  # <- DECSC
+
+    def put(self, lnum, text):
+        self.pending[lnum] = text
+
+    def flush(self):
+        if not self.pending:
+            return 0
+        parts = []
+        # Top to bottom
+        for lnum, text in sorted(self.pending.items(), reverse=True):
+            if self.bottom is not None:
+                parts.append("\x1b[%d;1H" % (self.bottom - lnum))
+            elif lnum:
+                parts.append("\x1b8\x1b[%dA\r" % lnum)
+            else:
+                parts.append("\x1b8\r")
+            parts.append(text)
+        parts.append("\x1b8")
+        self.pending.clear()
+        data = "".join(parts).encode()
+        self._write(data)
+        self.frames += 1
+        return len(data)
+
+
+class ColumnLayout:
+    """
+    Board column widths, padding included, as a list in the same order
+    as ``widths`` elsewhere, i.e., margins at either end. Cells are run
+    through ``fit()`` as they're formatted. One that's grown too wide
+    first sheds decimal places, and only when that's not enough does its
+    column widen, and then only as far as ``limit`` allows. Columns
+    never narrow, so boundaries rarely move. When one does, ``changed``
+    is set, and it's up to the caller to reflow and reset it.
+
+    >>> layout = ColumnLayout([2, 7, 2])  # <- room for 5 chars
+    >>> price = lambda num: lambda p: "{:.{p}f}".format(num, p=p)
+    >>> layout.fit(1, price(99.99), 2), layout.changed
+    ('99.99', False)
+    >>> layout.fit(1, price(100.004), 2), layout.changed
+    ('100.0', False)
+    >>> layout.fit(1, price(123456.7), 2), layout.widths, layout.changed
+    ('123457', [2, 8, 2], True)
+    """
+    def __init__(self, widths, pad=2, limit=None):
+        self.widths = list(widths)
+        self.pad = pad
+        self.limit = limit
+        self.changed = False
+        self.reflows = 0
+
+    def fit(self, col, render, places=0):
+        """
+        Return ``render(places)``, or ``render(p)`` for the largest
+        ``p < places`` whose result fits column ``col``. If none fits,
+        the column is widened to hold the shortest.
+        """
+        room = self.widths[col] - self.pad
+        text = render(places)
+        while len(text) > room and places > 0:
+            places -= 1
+            text = render(places)
+        if len(text) > room:
+            self.widen(col, len(text) - room)
+        return text
+
+    def widen(self, col, extra):
+        if self.limit is not None and sum(self.widths) + extra > self.limit:
+            return False
+        self.widths[col] += extra
+        if not self.changed:
+            self.reflows += 1
+        self.changed = True
+        return True
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+How stale is what's on screen? Each update is timed at four points:
+the exchange's own timestamp (``E`` on Binance, ``timestamp`` on
+HitBTC), its arrival in ``recv_handler``, its consumer being done with
+it (``mark_dirty()``) and the frame showing it being written. The gaps
+between those are the stages below, plus ``total``, end to end::
+
+    wire        exchange -> receipt (includes any clock skew)
+    consume     receipt -> record updated
+    paint       record updated -> frame written
+
+Only the latest update per symbol is timed, since that's what gets
+shown. Everything's kept in fixed-size histograms.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+from math import ceil, exp, log
+
+STAGES = ("wire", "consume", "paint", "total")
+LOW = 1e-5          # Seconds, upper edge of the lowest bucket
+DECADES = 7         # Buckets reach LOW * 10 ** DECADES, i.e., 100s
+PER_DECADE = 20     # About 12% between bucket edges
+
+
+class Histogram:
+    """
+    Durations in seconds, counted in log-spaced buckets, so memory is
+    fixed and percentiles are good to within a bucket. Anything below
+    ``LOW``, negatives included, lands in the first one.
+
+    >>> hist = Histogram()
+    >>> for ms in range(1, 101):
+    ...     hist.add(ms / 1000)
+    >>> hist.count, round(hist.percentile(50), 3), hist.percentile(100)
+    (100, 0.05, 0.1)
+    """
+    __slots__ = ("low", "scale", "counts", "count", "total", "max")
+
+    def __init__(self, low=LOW, decades=DECADES, per_decade=PER_DECADE):
+        self.low = low
+        self.scale = per_decade / log(10)
+        self.counts = [0] * (decades * per_decade + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def add(self, secs):
+        if secs < self.low:
+            index = 0
+        else:
+            index = min(int(log(secs / self.low) * self.scale) + 1,
+                        len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += secs
+        if self.max is None or secs > self.max:
+            self.max = secs
+
+    def percentile(self, pct):
+        """
+        Upper edge of the bucket holding the ``pct`` percentile, or
+        ``max`` if that's less, or None if empty
+        """
+        if not self.count:
+            return None
+        rank = max(1, ceil(self.count * pct / 100))
+        seen = 0
+        for index, num in enumerate(self.counts):
+            seen += num
+            if seen >= rank:
+                break
+        return min(self.low * exp(index / self.scale), self.max)
+
+    def summary(self):
+        return dict(count=self.count, p50=self.percentile(50),
+                    p99=self.percentile(99), max=self.max,
+                    mean=self.total / self.count if self.count else None)
+
+
+class LatencyTracker:
+    """
+    ``clock`` returns epoch seconds, like ``ExchangeClient.clock``. The
+    client sets ``received`` for each frame and calls ``consumed()``
+    from ``mark_dirty()``. The board calls ``painted()`` after writing.
+    """
+    def __init__(self, clock):
+        self.clock = clock
+        self.received = None
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.symbols = {}  # <- sym: Histogram of totals
+        self.pending = {}  # <- sym: (event, received, consumed)
+
+    def consumed(self, sym, event=None):
+        now = self.clock()
+        received = now if self.received is None else self.received
+        self.pending[sym] = (event, received, now)
+
+    def painted(self, syms):
+        if not self.pending:
+            return
+        now = self.clock()
+        stages = self.stages
+        for sym in syms:
+            times = self.pending.pop(sym, None)
+            if times is None:
+                continue  # <- repainted, but nothing new
+            event, received, consumed = times
+            stages["consume"].add(consumed - received)
+            stages["paint"].add(now - consumed)
+            if event is None:
+                continue
+            stages["wire"].add(received - event)
+            stages["total"].add(now - event)
+            hist = self.symbols.get(sym)
+            if hist is None:
+                hist = self.symbols[sym] = Histogram()
+            hist.add(now - event)
+
+    def summary(self, worst=5):
+        """Return a table of stages, in ms, and the ``worst`` symbols"""
+        def ms(secs):
+            return "%9s" % ("-" if secs is None else "%.1f" % (secs * 1e3))
+        out = ["%-12s%9s%9s%9s%9s" % ("Latency (ms)", "count", "p50", "p99",
+                                      "max")]
+        for stage, hist in self.stages.items():
+            info = hist.summary()
+            out.append("%-12s%9d%s%s%s" % (stage, info["count"],
+                                           ms(info["p50"]), ms(info["p99"]),
+                                           ms(info["max"])))
+        slowest = sorted(self.symbols.items(),
+                         key=lambda i: i[1].percentile(99), reverse=True)
+        if slowest:
+            out.append("Slowest by p99 total: %s" % ", ".join(
+                "%s %s" % (sym, ms(hist.percentile(99)).strip()) for
+                sym, hist in slowest[:worst]
+            ))
+        return "\n".join(out)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Health of a running ticker in Prometheus' text format, served over
+plain HTTP on a local port or Unix socket, e.g.::
+
+    METRICS=9464 tc-ticker
+    curl -s localhost:9464/metrics
+
+    METRICS=unix:/tmp/tct.sock tc-ticker
+    curl -s --unix-socket /tmp/tct.sock localhost/metrics
+
+Every sample is labeled with the exchange. Most values are read off
+their owners when scraped, so keeping them costs next to nothing.
+Latency quantiles only appear with ``LATENCY``.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import asyncio
+import os
+
+LAG_INTERVAL = 1.0  # Seconds between event-loop lag samples
+
+# Name: (type, help)
+METRICS = {
+    "tct_messages_received_total": ("counter", "Frames received, by stream"),
+    "tct_decode_errors_total": ("counter", "Frames that wouldn't decode"),
+    "tct_connects_total": ("counter", "Websocket connections opened"),
+    "tct_subscriptions": ("gauge", "Symbols subscribed to"),
+    "tct_stale_symbols": ("gauge", "Symbols whose data has gone stale"),
+    "tct_repaints_total": ("counter", "Board frames written"),
+    "tct_written_bytes_total": ("counter", "Bytes of board frames written"),
+    "tct_loop_lag_seconds": ("gauge", "Latest event-loop lag sample"),
+    "tct_loop_lag_max_seconds": ("gauge", "Worst event-loop lag sample"),
+    "tct_latency_seconds": ("summary", "Update latency, by stage"),
+}
+
+
+def parse_address(address):
+    """
+    >>> parse_address("9464"), parse_address("0.0.0.0:9464")
+    (('127.0.0.1', 9464), ('0.0.0.0', 9464))
+    >>> parse_address("unix:/tmp/tct.sock")
+    '/tmp/tct.sock'
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, __, port = str(address).rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def remove_socket(path):
+    """
+    Remove a socket left at ``path`` by an earlier run. Anything else
+    there raises ``FileExistsError``.
+    """
+    import stat
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError("Not a socket: %s" % path)
+    os.unlink(path)
+
+
+def format_value(value):
+    if value is None or value != value:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsExporter:
+    """
+    Counters the client bumps itself, plus gauges registered by whoever
+    owns them with ``watch()``. ``client`` is an ``ExchangeClient``.
+    """
+    def __init__(self, client, address, lag_interval=LAG_INTERVAL):
+        self.client = client
+        self.address = parse_address(address)
+        self.lag_interval = lag_interval
+        self.received = {}  # <- stream type: count
+        self.decode_errors = 0
+        self.connects = 0
+        self.lag = self.lag_max = 0.0
+        self.sources = {}  # <- metric name: func returning current value
+        self.server = None
+        self.lag_Task = None
+
+    def watch(self, name, func):
+        if name not in METRICS:
+            raise ValueError("Unknown metric: %r" % name)
+        self.sources[name] = func
+
+    def count(self, stream):
+        try:
+            self.received[stream] += 1
+        except KeyError:
+            self.received[stream] = 1
+
+    def collect(self):
+        """
+        Yield ``(name, labels, value)``, grouped by name. Summaries'
+        ``_sum`` and ``_count`` samples follow their quantiles.
+        """
+        for stream, num in sorted(self.received.items()):
+            yield "tct_messages_received_total", dict(stream=stream), num
+        yield "tct_decode_errors_total", {}, self.decode_errors
+        yield "tct_connects_total", {}, self.connects
+        yield "tct_subscriptions", {}, len(self.client.ticker_subscriptions)
+        for name, func in self.sources.items():
+            yield name, {}, func()
+        yield "tct_loop_lag_seconds", {}, self.lag
+        yield "tct_loop_lag_max_seconds", {}, self.lag_max
+        latency = self.client.latency
+        if latency is not None:
+            for stage, hist in latency.stages.items():
+                for quantile in ("0.5", "0.99"):
+                    yield ("tct_latency_seconds",
+                           dict(stage=stage, quantile=quantile),
+                           hist.percentile(float(quantile) * 100))
+                yield "tct_latency_seconds_sum", dict(stage=stage), hist.total
+                yield ("tct_latency_seconds_count", dict(stage=stage),
+                       hist.count)
+
+    def render(self):
+        exchange = self.client.exchange.lower()
+        out = []
+        current = None
+        for name, labels, value in self.collect():
+            family = (name if name in METRICS else
+                      name.rpartition("_")[0])  # <- summary's _sum, _count
+            if family != current:
+                current = family
+                kind, doc = METRICS[family]
+                out += ["# HELP %s %s" % (family, doc),
+                        "# TYPE %s %s" % (family, kind)]
+            labels = ",".join('%s="%s"' % item for item in
+                              dict(exchange=exchange, **labels).items())
+            out.append("%s{%s} %s" % (name, labels, format_value(value)))
+        return "\n".join(out) + "\n"
+
+    async def start(self):
+        if self.server is not None:
+            return self
+        if isinstance(self.address, str):
+            remove_socket(self.address)  # <- left by an earlier run
+            self.server = await asyncio.start_unix_server(self._handle,
+                                                          self.address)
+        else:
+            self.server = await asyncio.start_server(self._handle,
+                                                     *self.address)
+        self.lag_Task = asyncio.ensure_future(self._watch_lag())
+        self.client.echo("Serving metrics at %s" % (self.address,))
+        return self
+
+    async def stop(self):
+        if self.lag_Task is not None:
+            self.lag_Task.cancel()
+            self.lag_Task = None
+        if self.server is None:
+            return
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
+        if isinstance(self.address, str):
+            try:
+                remove_socket(self.address)
+            except OSError:
+                pass  # <- replaced since, so not ours
+
+    async def _watch_lag(self):
+        loop = asyncio.get_event_loop()
+        interval = self.lag_interval
+        while True:
+            start = loop.time()
+            try:
+                await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                break
+            self.lag = max(0.0, loop.time() - start - interval)
+            self.lag_max = max(self.lag_max, self.lag)
+
+    @staticmethod
+    async def _read_request(reader):
+        """Return the request line, skipping headers"""
+        line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        return line
+
+    async def _handle(self, reader, writer):
+        """
+        One GET per connection, no keep-alive
+        """
+        try:
+            line = await asyncio.wait_for(self._read_request(reader), 5)
+            method, target, __ = line.decode("latin-1").split(" ", 2)
+            if method == "GET" and target.partition("?")[0] in ("/metrics",
+                                                                "/"):
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(b"HTTP/1.1 %s\r\n"
+                         b"Content-Type: text/plain; version=0.0.4\r\n"
+                         b"Content-Length: %d\r\n"
+                         b"Connection: close\r\n\r\n" %
+                         (status.encode(), len(body)))
+            writer.write(body)
+            await writer.drain()
+        except (ConnectionError, ValueError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion rates between market currencies, for showing volume in a
+single unit.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+from collections import deque
+
+
+class RateGraph:
+    """
+    Rates from each of ``sources`` (quote currencies) to ``target``. The
+    path for each is found once, by fewest hops over the client's
+    conversion pairs. After that, ``refresh()`` only recomputes the
+    rates whose paths run through the pairs that ticked. USD and USDT
+    are treated as one currency when either is the target.
+
+    >>> from types import SimpleNamespace as NS
+    >>> from terminal_coin_ticker.clients import TickerRecord
+    >>> client = NS(symbols={"ETHBTC": dict(curB="ETH", curQ="BTC"),
+    ...                      "BTCUSDT": dict(curB="BTC", curQ="USDT")},
+    ...             ticker={})
+    >>> for sym, last in (("ETHBTC", 5000), ("BTCUSDT", 1000000)):
+    ...     client.ticker[sym] = TickerRecord(sym, pdp=2)
+    ...     client.ticker[sym].last = last
+    >>> rates = RateGraph(client, {"ETHBTC", "BTCUSDT"}, "USD", {"ETH"})
+    >>> rates.paths["ETH"], sorted(rates.pairs)
+    ((('ETHBTC', False), ('BTCUSDT', False)), ['BTCUSDT', 'ETHBTC'])
+    >>> rates.convert("ETH", 2.0)
+    1000000.0
+    >>> client.ticker["BTCUSDT"].last = 2000000
+    >>> rates.refresh({"BTCUSDT"}), rates.convert("ETH", 2.0)
+    ({'ETH'}, 2000000.0)
+    """
+    def __init__(self, client, conversions, target, sources=()):
+        self.client = client
+        self.target = target
+        self.rates = {target: 1.0}
+        self.paths = {target: ()}  # <- source: ((sym, invert), ...)
+        self.dependents = {}  # <- sym: {source, ...}
+        # Edges run both ways. Converting an amount of a pair's base to
+        # its quote means multiplying by the price, the other way round,
+        # dividing (``invert``).
+        edges = {}
+        for sym in conversions:
+            info = client.symbols[sym]
+            base, quote = self.node(info["curB"]), self.node(info["curQ"])
+            if base != quote:
+                edges.setdefault(base, []).append((quote, sym, False))
+                edges.setdefault(quote, []).append((base, sym, True))
+        # Breadth-first from the target, recording each currency's first
+        # step back toward it
+        self._steps = {target: None}
+        queue = deque([target])
+        while queue:
+            cur = queue.popleft()
+            for nxt, sym, invert in sorted(edges.get(cur, ())):
+                if nxt not in self._steps:
+                    self._steps[nxt] = (cur, sym, not invert)
+                    queue.append(nxt)
+        for source in sources:
+            self.add_source(source)
+
+    @property
+    def pairs(self):
+        """Symbols that must be subscribed to for the current sources"""
+        return set(self.dependents)
+
+    def node(self, currency):
+        if self.target in ("USD", "USDT") and currency in ("USD", "USDT"):
+            return self.target
+        return currency
+
+    def add_source(self, currency):
+        """
+        Find the path from ``currency`` to the target and compute its
+        rate. Unreachable currencies get a rate of None.
+        """
+        source = self.node(currency)
+        if source in self.paths:
+            return self.paths[source]
+        path = []
+        step = self._steps.get(source)
+        while step is not None:
+            cur, sym, invert = step
+            path.append((sym, invert))
+            step = self._steps[cur]
+        self.paths[source] = path = (tuple(path) if source in self._steps else
+                                     None)
+        for sym, __ in path or ():
+            self.dependents.setdefault(sym, set()).add(source)
+        self._update(source)
+        return path
+
+    def _update(self, source):
+        path = self.paths[source]
+        rate = None if path is None else 1.0
+        for sym, invert in path or ():
+            record = self.client.ticker.get(sym)
+            if record is None or not record.last:
+                rate = None
+                break
+            price = record.last / 10 ** record.pdp
+            rate = rate / price if invert else rate * price
+        self.rates[source] = rate
+
+    def refresh(self, symbols):
+        """
+        Recompute rates depending on any of ``symbols``, which have just
+        been updated, and return the affected sources
+        """
+        touched = set()
+        for sym in symbols:
+            touched.update(self.dependents.get(sym, ()))
+        for source in touched:
+            self._update(source)
+        return touched
+
+    def convert(self, currency, amount):
+        """
+        Return ``amount`` of ``currency`` in target units or NaN if
+        there's no rate
+        """
+        rate = self.rates.get(self.node(currency))
+        return float("nan") if rate is None else amount * rate
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Terminal capabilities, read from the terminfo db in-process. This only
+calls ``curses.setupterm()``, which doesn't touch the screen, so nothing
+else from curses needs to be in play.
+"""
+# This file is part of <https://github.com/poppyschmo/terminal-coin-ticker>
+
+import sys
+
+_caps = {}
+_ready = None
+
+
+def setup(term=None):
+    """
+    Load the entry for ``term`` or ``$TERM``. Returns False when there's
+    no curses module or no such entry, in which case all lookups are
+    empty. Called on first lookup if not sooner.
+    """
+    global _ready
+    _caps.clear()
+    try:
+        import curses
+    except ImportError:
+        _ready = False
+        return _ready
+    try:
+        fd = sys.stdout.fileno()
+    except (AttributeError, ValueError):
+        fd = -1
+    try:
+        curses.setupterm(term, fd)
+    except curses.error:
+        _ready = False
+    else:
+        _ready = True
+    return _ready
+
+
+def get(name):
+    """
+    Return the escape sequence for string capability ``name`` or an
+    empty string if the terminal doesn't have it, as with ``tput``.
+    Parameterized caps aren't supported.
+    """
+    try:
+        return _caps[name]
+    except KeyError:
+        pass
+    if _ready is None:
+        setup()
+    value = ""
+    if _ready:
+        import curses
+        raw = curses.tigetstr(name)
+        if raw:
+            value = raw.decode("latin-1")
+    _caps[name] = value
+    return value
@@ -21,10 +21,8 @@ displayed is often inaccurate and should be considered untrustworthy.
 # Author: Jane Soko
 # License: Apache 2.0
 
-import asyncio
 import os
 import sys
-from decimal import Decimal as Dec
 from enum import Enum
 
 if __name__ == "__main__":
@@ -32,29 +30,66 @@ if __name__ == "__main__":
         os.path.dirname(os.path.abspath(__file__))))
 
 from terminal_coin_ticker import (  # noqa E402
-    add_async_sig_handlers, remove_async_sig_handlers, ppj, decimate
+    add_async_sig_handlers, remove_async_sig_handlers, ppj, format_scaled
 )
-from terminal_coin_ticker.clients import hitbtc, binance  # noqa E402
+from terminal_coin_ticker.display import (  # noqa E402
+    ColumnLayout, Compositor
+)
+from terminal_coin_ticker import terminfo  # noqa E402
 
 # Env vars
-EXCHANGE = "HitBTC"  # Or Binance (slim pickings, at the moment)
-VOL_SORTED = True    # Sort all pairs by volume, AUTO_FILL'd or named
-VOL_UNIT = "USD"     # BTC, ETH, etc., or null for base currencies
-HAS_24 = False       # Override COLORTERM if outlawed in environment
-PULSE = "normal"     # Flash style of "normal," "fast," or null (off)
-PULSE_OVER = 0.125   # Flash threshold as % change in last price
-HEADING = "normal"   # Also "hr_over," "hr_under," "full," and "slim"
-AUTO_CULL = True     # Drop excess PAIRs, and warn instead of exiting
-AUTO_FILL = True     # Absent NUM, add volume leaders till MAX_FILL
-MAX_FILL = 24        # Or null/non-int to use term height (absent NUM)
-STRICT_TIME = True   # Die when service notifications aren't updating
-VERBOSITY = 6        # Ignored without LOGFILE (device, file, etc.)
-USE_AIOHTTP = False  # Ignored unless ``websockets`` is also installed
+EXCHANGE = "HitBTC"
+VOL_SORTED = True
+LIVE_SORT = False
+VOL_UNIT = "USD"
+HAS_24 = False
+PULSE = "normal"
+PULSE_OVER = 0.125
+HEADING = "normal"
+AUTO_CULL = True
+AUTO_FILL = True
+MAX_FILL = 24
+STRICT_TIME = True
+VERBOSITY = 6
+USE_AIOHTTP = False
+JSON_DECODER = ""
+ARB_ROWS = 0
+CAPTURE = ""
+REPLAY = ""
+REPLAY_SPEED = 1.0
+LATENCY = False
+METRICS = ""
+
+# Help for the above, listed by --help, which shouldn't have to import
+# or parse anything
+ENV_DOCS = {
+    "EXCHANGE": "Or Binance (slim pickings, at the moment)",
+    "VOL_SORTED": "Sort all pairs by volume, AUTO_FILL'd or named",
+    "LIVE_SORT": "Keep VOL_SORTED rows in order while running",
+    "VOL_UNIT": "BTC, ETH, etc., or null for base currencies",
+    "HAS_24": "Override COLORTERM if outlawed in environment",
+    "PULSE": 'Flash style of "normal," "fast," or null (off)',
+    "PULSE_OVER": "Flash threshold as % change in last price",
+    "HEADING": 'Also "hr_over," "hr_under," "full," and "slim"',
+    "AUTO_CULL": "Drop excess PAIRs, and warn instead of exiting",
+    "AUTO_FILL": "Absent NUM, add volume leaders till MAX_FILL",
+    "MAX_FILL": "Or null/non-int to use term height (absent NUM)",
+    "STRICT_TIME": "Die when service notifications aren't updating",
+    "VERBOSITY": "Ignored without LOGFILE (device, file, etc.)",
+    "USE_AIOHTTP": "Ignored unless ``websockets`` is also installed",
+    "JSON_DECODER": "Or orjson, ujson, json. Fastest available if null",
+    "ARB_ROWS": "Show this many triangular arbitrage edges up top",
+    "CAPTURE": "Append raw frames to this file (.gz, .zst ok)",
+    "REPLAY": "Play a CAPTURE file instead of connecting",
+    "REPLAY_SPEED": "Multiplier for REPLAY, 0 for as fast as possible",
+    "LATENCY": "Time updates to screen. Summary on exit, SIGUSR1",
+    "METRICS": "Serve metrics at [HOST:]PORT or unix:PATH",
+}
 
 # TTL vars
 MAX_STALE = 0.5      # Tolerance threshold ratio of stale/all pairs
 STALE_SECS = 15      # Max seconds pair data is considered valid
-POLL_INTERVAL = 10   # Seconds to wait between checks
+POLL_INTERVAL = 10   # Seconds between checks for initial subscriptions
 
 
 class Headings(Enum):
@@ -63,40 +98,53 @@ class Headings(Enum):
     full = 3
 
 
-def _convert_volume(client, sym, base, quote, tickdict):
+def _convert_volume(rates, quote, record):
     """
-    Return volume in target units. Assumptions:
-    1. ``target`` exists in ``client.markets``
-    2. ``sym`` is canonical (in correct format and confirmed available)
-    3. ``tickdict`` has been decimated (digit strings to Decimal instances)
+    Return volume in ``VOL_UNIT`` as a float. ``rates`` is a ``RateGraph``
+    with ``quote`` among its sources, and ``record`` a ``TickerRecord``.
     """
-    # XXX this might be better suited as a decorator that returns a
-    # converter already primed with all the exchange particulars.
-    target = VOL_UNIT
-    #
-    # At least for HitBTC, Symbol records have a "quoteCurrency" entry
-    # that's always "USD", but some symbols end in "USDT"
-    if sym.endswith(target) or (target == "USD" and sym.endswith("USDT")):
-        return tickdict["volQ"]
-    #
-    assert client.conversions is not None
-    if quote + target in client.conversions:
-        rate = Dec(client.ticker[quote + target]["last"])
-    else:
-        rate = 1 / Dec(client.ticker[target + quote]["last"])
-    return Dec(client.ticker[sym]["volQ"]) * rate
+    return rates.convert(quote, record.volQ / 10 ** record.pdp)
+
+
+def _price_places(client, sym):
+    """
+    Decimal places for displaying ``sym``'s prices. Those exceeding $10 in
+    the USD(T) market are rounded to cents.
+    """
+    record = client.ticker[sym]
+    if ("USD" in client.symbols[sym]["curQ"] and
+            record.last >= 10 * 10 ** record.pdp):
+        return 2
+    return record.pdp
 
 
-def _print_heading(client, colors, widths, numrows, volstr):
-    from subprocess import check_output
+def _dump_latency(client):
+    """
+    Write ``client.latency``'s summary to ``LOGFILE`` or, since stderr
+    is otherwise the screen, to ``latency.txt`` in the cache dir
+    """
+    summary = client.latency.summary()
+    if hasattr(LOGFILE, "write"):
+        print(summary, file=LOGFILE, flush=True)
+        return
+    from terminal_coin_ticker.clients.catalog import get_cache_dir
+    path = os.path.join(get_cache_dir(), "latency.txt")
     try:
-        sitm = check_output(["tput", "sitm"]).decode()
-        ritm = check_output(["tput", "ritm"]).decode()
-    except FileNotFoundError:
-        sitm = ritm = ""
-    else:
-        if not ritm:
-            sitm = ""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            print(summary, file=f)
+    except OSError as exc:
+        client.echo("Couldn't write %s: %r" % (path, exc), 5)
+
+
+def _render_heading(client, colors, widths, numrows, volstr):
+    """
+    Return the heading followed by ``numrows`` blank board rows, the
+    last of which is left open
+    """
+    sitm, ritm = terminfo.get("sitm"), terminfo.get("ritm")
+    if not ritm:
+        sitm = ""
     #
     bg, fg = colors
     #
@@ -119,17 +167,15 @@ def _print_heading(client, colors, widths, numrows, volstr):
         bg.dark if HAS_24 else bg.tint, " " * sum(widths), "\x1b[m\x1b[K"
     )
     if HEADING == "normal":
-        print(head_bg, " " * widths[0],  # heading background, left margin
-              # exchange
-              fg.dark, sitm,
-              "{:<{w}}".format(client.exchange, w=widths[1]), ritm,
-              # heading
-              head_fg, head_fmt.format("Price", volstr, "Bid", "Ask",
-                                       "Δ (24h)", ""), nl,
-              # hr
-              head_bg, fg.dark, "\x1b[4m", "─" * sum(widths), nl,
-              # board
-              *board, sep="", end="")
+        parts = (head_bg, " " * widths[0],  # heading bg, left margin
+                 # exchange
+                 fg.dark, sitm,
+                 "{:<{w}}".format(client.exchange, w=widths[1]), ritm,
+                 # heading
+                 head_fg, head_fmt.format("Price", volstr, "Bid", "Ask",
+                                          "Δ (24h)", ""), nl,
+                 # hr
+                 head_bg, fg.dark, "\x1b[4m", "─" * sum(widths), nl)
     elif "hr_" in HEADING:
         ex_hr = (head_bg, sitm, fg.faint_shade if HAS_24 else fg.dark,
                  "─" * widths[0], client.exchange,
@@ -138,43 +184,50 @@ def _print_heading(client, colors, widths, numrows, volstr):
                    head_fmt.format("", "", "Price", volstr, "Bid", "Ask",
                                    "Δ (24h)", ""), nl)
         if HEADING == "hr_over":
-            print(*ex_hr, *heading, *board, sep="", end="")
+            parts = (*ex_hr, *heading)
         else:
-            print(*heading, *ex_hr, *board, sep="", end="")
+            parts = (*heading, *ex_hr)
     elif HEADING == "full":
-        print(  # exchange
-              head_bg, sitm, fg.faint_shade if HAS_24 else fg.dark,
-              "─" * (sum(widths) - len(client.exchange) - widths[-1]),
-              client.exchange, "─" * widths[-1], ritm, nl,
-              # heading
-              head_bg, head_fg,
-              head_fmt.format("", "Pair", "Price", volstr, "Bid", "Ask",
-                              "Δ (24h)", ""), nl,
-              # hr
-              head_bg, fg.faint_shade if HAS_24 else fg.dark,
-              "\x1b[4m", "─" * sum(widths), nl,
-              # board
-              *board, sep="", end="")
+        parts = (  # exchange
+                 head_bg, sitm, fg.faint_shade if HAS_24 else fg.dark,
+                 "─" * (sum(widths) - len(client.exchange) - widths[-1]),
+                 client.exchange, "─" * widths[-1], ritm, nl,
+                 # heading
+                 head_bg, head_fg,
+                 head_fmt.format("", "Pair", "Price", volstr, "Bid", "Ask",
+                                 "Δ (24h)", ""), nl,
+                 # hr
+                 head_bg, fg.faint_shade if HAS_24 else fg.dark,
+                 "\x1b[4m", "─" * sum(widths), nl)
     elif HEADING == "slim":
-        print(head_bg, " " * widths[0],  # heading background, left margin
-              # exchange
-              fg.dark, sitm, "{:<{w}}".format(client.exchange, w=widths[1]),
-              ritm if HAS_24 else "",
-              # heading
-              head_fg, head_fmt.format("Price", volstr, "Bid", "Ask",
-                                       "Δ (24h)", ""), nl,
-              # board
-              *board, sep="", end="")
+        parts = (head_bg, " " * widths[0],  # heading bg, left margin
+                 # exchange
+                 fg.dark, sitm,
+                 "{:<{w}}".format(client.exchange, w=widths[1]),
+                 ritm if HAS_24 else "",
+                 # heading
+                 head_fg, head_fmt.format("Price", volstr, "Bid", "Ask",
+                                          "Δ (24h)", ""), nl)
+    return "".join((*parts, *board))
+
+
+def _print_heading(*args):
+    print(_render_heading(*args), sep="", end="")
 
 
 async def _check_timestamps(all_subs, client, kill_handler, strict=True,
                             max_stale=MAX_STALE, stale_secs=STALE_SECS,
                             poll_interval=POLL_INTERVAL):
     """
-    Iterate over latest ticker entries and check timestamps against ttl
-    threshold.  Like ``_paint_ticker_line()``, it doesn't make sense to
-    return a value for this function because it can only die if its
-    outer future is cancelled.
+    Keep a heap of deadlines, one per symbol, marking when its latest
+    data will have gone stale, and sleep till the earliest. Entries are
+    only rescheduled when popped, so updates themselves cost nothing
+    here. Stale symbols leave the heap and are tracked in a set, which
+    is all that's needed for the ``max_stale`` ratio. While it's
+    nonempty, an update feed is used to notice them coming back. Like
+    ``_paint_ticker_board()``, it doesn't make sense to return a value
+    for this function because it can only die if its outer future is
+    cancelled.
 
     Sending ``SIGINT`` to pid 0 raises ``BlockingIOError`` (errno 11).
     Raising a ``KeyboardInterrupt`` works, but the teardown handlers
@@ -189,142 +242,372 @@ async def _check_timestamps(all_subs, client, kill_handler, strict=True,
     heartbeat-related options that probably require an actual
     understanding of websockets standards/conventions.
     """
-    from itertools import cycle
-    from datetime import datetime
+    import asyncio
+    import heapq
+    time = client.clock
+
+    def get_time(sym):
+        record = client.ticker.get(sym)
+        return None if record is None else record.time
+
+    if not all_subs:
+        return "_check_timestamps had nothing to check"
     while not client.ticker_subscriptions:
-        await asyncio.sleep(poll_interval)
+        try:
+            await asyncio.sleep(poll_interval)
+        except asyncio.CancelledError:
+            return "_check_timestamps cancelled"
+    now = time()
+    deadlines = [((get_time(sym) or now) + stale_secs, sym) for
+                 sym in all_subs]
+    heapq.heapify(deadlines)
     stale_subs = set()
-    for sym in cycle(all_subs):
-        ts_str = client.ticker[sym]["time"]
-        if ts_str is None:
-            continue
-        diff = (datetime.utcnow() - client.make_date(ts_str)).seconds
-        if diff > stale_secs:
+    feed = None
+    if client.exporter is not None:
+        client.exporter.watch("tct_stale_symbols", lambda: len(stale_subs))
+    try:
+        while True:
+            wait = deadlines[0][0] - time() if deadlines else None
+            if wait is None or wait > 0:
+                if not stale_subs:
+                    await asyncio.sleep(wait)
+                    continue
+                try:
+                    refreshed = await asyncio.wait_for(feed.drain(), wait)
+                except asyncio.TimeoutError:
+                    continue
+                for sym in refreshed & stale_subs:
+                    ts = get_time(sym)
+                    if ts is not None:  # <- not just marked
+                        stale_subs.discard(sym)
+                        heapq.heappush(deadlines, (ts + stale_secs, sym))
+                if not stale_subs:
+                    client.remove_update_feed(feed)
+                    feed = None
+                continue
+            deadline, sym = heapq.heappop(deadlines)
+            ts = get_time(sym)
+            now = time()
+            if ts is not None and ts + stale_secs > now:
+                heapq.heappush(deadlines, (ts + stale_secs, sym))
+                continue
+            diff = int(now - (deadline - stale_secs if ts is None else ts))
             if LOGFILE:
-                # Using ``*.call_soon`` doesn't seem to make a difference here
                 client.echo("Stale timestamp for %r. Off by %d min %d secs" %
                             (sym, *divmod(diff, 60)), 5)
+            if not stale_subs:
+                feed = client.add_update_feed()
             stale_subs.add(sym)
             if strict and len(stale_subs) / len(all_subs) > max_stale:
                 kill_handler(error="The number of pairs awaiting updates has "
                              "exceeded the maximum allowed",
                              msg="Killed by _check_timestamps")
                 break
-            else:
-                client.ticker[sym]["time"] = None  # <- mark as stale
-        else:
-            stale_subs.discard(sym)
-        try:
-            await asyncio.sleep(poll_interval)
-        except asyncio.CancelledError:
-            break
+            elif ts is not None:
+                client.ticker[sym].time = None  # <- mark as stale
+                client.mark_dirty(sym, fresh=False)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if feed is not None:
+            client.remove_update_feed(feed)
     client.echo("Exiting", 6)
     return "_check_timestamps cancelled"
 
 
-async def _paint_ticker_line(client, lnum, sym, semaphore, snapshots, fmt,
-                             colors, bq_pair, wait=1.0, pulse_over=PULSE_OVER):
+class TickerLine:
     """
-    The kwargs are tweakable and should perhaps be presented as global
-    options. ``wait`` is the update period. ``pulse_over`` is the
-    red/green flash threshold.
+    Display state for a single row. The kwargs are tweakable and should
+    perhaps be presented as global options. ``pulse_over`` is the
+    red/green flash threshold. Cells are fitted to their columns by
+    ``layout``, a ``ColumnLayout`` shared by all rows.
     """
-    base, quote = bq_pair
-    cbg, cfg = colors
-    sep = "/"
-    bg = cbg.shade if lnum % 2 else cbg.tint
-    up = "\x1b[A" * lnum + "\r"
-    down = "\x1b[B" * lnum
-    tick = Dec(client.symbols[sym]["tick"])
-    last_seen = {}
-    #
-    # Delay pulsing while staggering initial update
-    pulse_over, pulse_delay, pulse = Dec(pulse_over), 5, None
-    _pulse_over = Dec(pulse_over + pulse_delay)
-    from random import random
-    #
-    while True:
-        # Without this, pulses get backlogged/front-loaded and fire in a
-        # fusillade on init, sometimes after a short hang. Not sure why.
-        if _pulse_over > pulse_over:
-            _pulse_over -= Dec(1)
-            _wait = random()
-        try:
-            await asyncio.sleep(_wait)
-        except asyncio.CancelledError:
-            break
-        _wait = wait
-        if pulse:
-            latest = last_seen
+    def __init__(self, client, lnum, sym, fmt, colors, bq_pair,
+                 pulse_over=PULSE_OVER, places=None, rates=None,
+                 layout=None, vol_places=0):
+        self.client = client
+        self.rates = rates  # <- RateGraph, required for VOL_UNIT
+        self.places = places  # <- for prices, None means tick size
+        self.vol_places = vol_places  # <- for converted volume
+        self.layout = layout
+        self.lnum = lnum
+        self.sym = sym
+        self.fmt = fmt
+        self.colors = colors
+        self.base, self.quote = bq_pair
+        self.bg = colors[0].shade if lnum % 2 else colors[0].tint
+        self.shown = {}  # <- values last painted, as strings
+        self.last = self.chg = None  # <- numbers behind ``shown``
+        self.clrs = None
+        self.pulse = None
+        self.held = False  # <- pulse still showing, ignore new data
+        #
+        # Delay pulsing for the first few paints
+        self.pulse_over, pulse_delay = pulse_over, 5
+        self._pulse_over = pulse_over + pulse_delay
+
+    def move(self, lnum):
+        """
+        Take over row ``lnum``. Any pulse is dropped, so the next paint
+        is a normal one in the new row's colors.
+        """
+        self.lnum = lnum
+        self.bg = self.colors[0].shade if lnum % 2 else self.colors[0].tint
+        self.pulse = None
+        self.held = False
+
+    def paint(self):
+        """
+        Return the formatted line and the number of seconds it should be
+        held (left alone) before being repainted, or None
+        """
+        cbg, cfg = self.colors
+        bg = self.bg
+        shown = self.shown
+        hold = None
+        # Without this, pulses fire in a fusillade on init
+        if self._pulse_over > self.pulse_over:
+            self._pulse_over -= 1
+        if self.pulse:
+            clrs = self.clrs
         else:
-            latest = decimate(dict(client.ticker[sym]))
-            if client.quantize is True:
-                for key in ("last", "ask", "bid"):
-                    latest[key] = latest[key].quantize(tick)
-            if snapshots.get(sym) and snapshots[sym] == latest:
-                continue
-            last_seen = snapshots.setdefault(sym, latest)
-            # Better to save as decimal quotient and only display as percent
-            change = ((latest["last"] - latest["open"]) / latest["open"])
-            latest["chg"] = change
+            record = self.client.ticker[self.sym]
+            last = record.last
+            # Better to save as quotient and only display as percent
+            change = (last - record.open) / record.open
+            prev_last = last if self.last is None else self.last
+            prev_change = change if self.chg is None else self.chg
+            self.last, self.chg = last, change
+            pdp = record.pdp
+            places = pdp if self.places is None else self.places
+            fit = self.layout.fit
+            # Column numbers are those of ``widths``
+            shown["last"] = fit(2, lambda p: format_scaled(last, pdp, p),
+                                places)
+            for key, col, num in (("bid", 4, record.bid),
+                                  ("ask", 5, record.ask)):
+                shown[key] = ("" if num is None else
+                              fit(col, lambda p: format_scaled(num, pdp, p),
+                                  places))
+            if VOL_UNIT:
+                vol = _convert_volume(self.rates, self.quote, record)
+                shown["volconv"] = fit(3, lambda p: "{:,.{p}f}".format(
+                    vol, p=p
+                ), self.vol_places)
+            else:
+                shown["volB"] = fit(
+                    3, lambda p: format_scaled(record.volB, record.qdp, p),
+                    record.qdp
+                )
+            shown["chg"] = fit(6, lambda p: "{:+.{p}%}".format(change, p=p),
+                               3)
+            shown["time"] = record.time
             # Use explicit value for ``normal`` instead of ``\e[39m`` to reset
-            clrs = dict(_beg=bg, _sym=cfg.dim, _sepl=cfg.normal,
-                        _sepr=cfg.dim, _prc=cfg.normal, _vol=cfg.dim,
-                        _chg="", _end="\x1b[m\x1b[K")
+            clrs = self.clrs = dict(_beg=bg, _sym=cfg.dim, _sepl=cfg.normal,
+                                    _sepr=cfg.dim, _prc=cfg.normal,
+                                    _vol=cfg.dim, _chg="", _end="\x1b[m\x1b[K")
             clrs["_chg"] = (cfg.red if change < 0 else
                             cfg.green if change > 0 else clrs["_vol"])
         #
-        volconv = None
-        if VOL_UNIT:
-            volconv = _convert_volume(client, sym, base, quote, latest)
-        #
-        if pulse:
+        if self.pulse:
             if HAS_24:
                 clrs["_beg"] = (cbg.mix_green if
-                                pulse == "+" else cbg.mix_red)
+                                self.pulse == "+" else cbg.mix_red)
             else:
                 clrs["_beg"] = bg
                 clrs["_prc"] = clrs["_chg"] = (
-                    cfg.bright_green if pulse == "+" else cfg.bright_red
+                    cfg.bright_green if self.pulse == "+" else cfg.bright_red
                 )
-                clrs["_vol"] = cfg.green if pulse == "+" else cfg.red
-            _wait = 0.124 if PULSE == "fast" else 0.0764
-            pulse = None
-        elif latest["time"] is None:
+                clrs["_vol"] = cfg.green if self.pulse == "+" else cfg.red
+            hold = 0.124 if PULSE == "fast" else 0.0764
+            self.pulse = None
+        elif shown["time"] is None:
             clrs.update(dict(_sym=cfg.dark, _sepl="", _sepr="",
-                             _prc=(cfg.faint_shade if lnum % 2 else
+                             _prc=(cfg.faint_shade if self.lnum % 2 else
                                    cfg.faint_tint), _vol="", _chg=""))
-            change, pulse = 0, None
         # Must divide by 100 because ``_pulse_over`` is a %
-        elif (abs(abs(latest["last"]) - abs(last_seen["last"])) >
-              abs(_pulse_over / 100 * last_seen["last"])):
-            pulse = None
-            _wait = 0.0764 if PULSE == "fast" else 0.124
-            if change - last_seen["chg"] > 0:
-                pulse = "+"
+        elif abs(last - prev_last) > self._pulse_over / 100 * prev_last:
+            hold = 0.0764 if PULSE == "fast" else 0.124
+            if change - prev_change > 0:
+                self.pulse = "+"
                 clrs["_beg"] = cbg.green
                 if not HAS_24:
                     clrs.update(dict(_sym=cfg.green, _sepl="", _sepr="",
                                      _vol="", _prc="", _chg=""))
             else:
-                pulse = "-"
+                self.pulse = "-"
                 clrs["_beg"] = cbg.red
                 if not HAS_24:
                     clrs.update(dict(_sym=cfg.red, _sepl="", _sepr="",
                                      _vol="", _prc="", _chg=""))
+        line = self.fmt.format("", "", base=self.base.lower(), sep="/",
+                               quote=self.quote.lower(), **clrs, **shown)
+        return line, hold
+
+
+class VolumeRanker:
+    """
+    Keeps ``lines`` (``TickerLine``s) sorted by converted volume, biggest
+    on top, as it changes. Only rows that ticked, or whose quote's rate
+    did, are considered, and each is bubbled past its neighbors, so
+    moves are local. A row must lead a neighbor by more than ``margin``
+    (a fraction) to pass it, which keeps near-ties from flapping.
+    """
+    def __init__(self, lines, rates, margin=0.02):
+        self.rows = sorted(lines.values(), key=lambda line: line.lnum)
+        self.rates = rates
+        self.margin = margin
+
+    def volume(self, line):
+        vol = _convert_volume(self.rates, line.quote,
+                              line.client.ticker[line.sym])
+        return vol if vol == vol else -1.0  # <- NaN
+
+    def update(self, lines, touched=()):
+        """
+        Reposition ``lines`` and those quoted in ``touched`` currencies
+        (rates changed) and return all rows that moved
+        """
+        rows = self.rows
+        node = self.rates.node
+        candidates = set(lines)
+        if touched:
+            candidates.update(line for line in rows if
+                              node(line.quote) in touched)
+        moved = set()
+        factor = 1 + self.margin
+        top = len(rows) - 1
+        for line in candidates:
+            old = i = line.lnum
+            vol = self.volume(line)
+            while i < top and vol > self.volume(rows[i + 1]) * factor:
+                rows[i], rows[i + 1] = rows[i + 1], rows[i]
+                i += 1
+            while i > 0 and vol * factor < self.volume(rows[i - 1]):
+                rows[i], rows[i - 1] = rows[i - 1], rows[i]
+                i -= 1
+            if i == old:
+                continue
+            for lnum in range(min(old, i), max(old, i) + 1):
+                rows[lnum].move(lnum)
+                moved.add(rows[lnum])
+        return moved
+
+
+class ArbLines:
+    """
+    Optional rows above the board showing the ``num`` best triangles
+    found by ``scanner``, a ``TriangleScanner``. Rows are only written
+    when their text changes.
+    """
+    def __init__(self, scanner, lnum, num, widths, colors):
+        self.scanner = scanner
+        self.lnums = range(lnum + num - 1, lnum - 1, -1)  # <- best on top
+        self.widths = widths
+        self.colors = colors
+        self.shown = {}  # <- lnum: text
+
+    def paint(self, dirty):
+        """
+        Return ``(lnum, text)`` for each row changed by ``dirty`` symbols
+        """
+        if not self.scanner.refresh(dirty) and self.shown:
+            return ()
+        cbg, cfg = self.colors
+        widths = self.widths
+        body = sum(widths[1:-1])
+        best = self.scanner.best(len(self.lnums))
+        changed = []
+        for lnum, rank in zip(self.lnums, range(len(self.lnums))):
+            parts = [cbg.shade if lnum % 2 else cbg.tint, " " * widths[0]]
+            if rank < len(best):
+                edge, path = best[rank]
+                edge_str = "{:+.3%}".format(edge)
+                path_str = " → ".join(c.lower() for c in path)
+                path_w = body - len(edge_str)
+                parts += [cfg.dim, "{:<{w}.{w}}".format(path_str, w=path_w),
+                          (cfg.red if edge < 0 else cfg.green if edge > 0 else
+                           cfg.dim), edge_str]
+            else:
+                parts.append(" " * body)
+            parts += [" " * widths[-1], "\x1b[m\x1b[K"]
+            text = "".join(parts)
+            if self.shown.get(lnum) != text:
+                self.shown[lnum] = text
+                changed.append((lnum, text))
+        return changed
+
+
+async def _paint_ticker_board(client, lines, feed, compositor,
+                              min_interval=1/30, rates=None, arb=None,
+                              ranker=None, layout=None, reflow=None):
+    """
+    Repaint rows whose symbols have been marked dirty by the client's
+    consumers. Everything touched since the previous pass goes out as a
+    single ``compositor`` frame, and passes are spaced at least
+    ``min_interval`` seconds apart, so bursts get coalesced. Pulsing
+    rows are held and then pushed back onto the feed once their flash
+    is up. Volume conversion ``rates`` are refreshed first, so rows never
+    see ones older than their own data. ``arb`` is an ``ArbLines`` and
+    ``ranker`` a ``VolumeRanker``. When a cell widens a column of the
+    shared ``layout``, ``reflow()`` is called for any rows besides the
+    ticker lines needing rewritten, and every line is repainted in the
+    same frame. Symbols shown anew are reported to ``client.latency``
+    once their frame is out.
+    """
+    import asyncio
+    loop = asyncio.get_event_loop()
+    latency = client.latency
+    shown = []
+
+    def release(line):
+        line.held = False
+        feed.push(line.sym)
+
+    def show(line):
+        if latency is not None and not line.pulse:  # <- not a pulse ending
+            shown.append(line.sym)
+        text, hold = line.paint()
+        if hold:
+            line.held = True
+            loop.call_later(hold, release, line)
+        compositor.put(line.lnum, text)
+
+    while True:
+        try:
+            dirty = await feed.drain()
+        except asyncio.CancelledError:
+            break
+        touched = rates.refresh(dirty) if rates is not None else ()
+        if ranker is not None:
+            moved = ranker.update((lines[s] for s in dirty if s in lines),
+                                  touched)
+            dirty.update(line.sym for line in moved)
+        for sym in dirty:
+            line = lines.get(sym)
+            if line is None or line.held:
+                continue  # <- conversion pair or mid-pulse
+            show(line)
+        if layout is not None and layout.changed:
+            layout.changed = False
+            for lnum, text in reflow():
+                compositor.put(lnum, text)
+            for line in lines.values():
+                if not line.held:
+                    show(line)
+        if arb is not None:
+            for lnum, text in arb.paint(dirty):
+                compositor.put(lnum, text)
+        compositor.flush()
+        if shown:
+            latency.painted(shown)
+            shown.clear()
         try:
-            with await semaphore:
-                print(up,
-                      fmt.format("", "", base=base.lower(), sep=sep,
-                                 quote=quote.lower(), **clrs, **latest,
-                                 volconv=volconv),
-                      down,
-                      sep="", end="", flush=True)
+            await asyncio.sleep(min_interval)
         except asyncio.CancelledError:
             break
-        last_seen.update(latest)
     #
-    return "Cancelled _paint_ticker_line for: %s" % sym
+    return "Cancelled _paint_ticker_board"
 
 
 async def do_run_ticker(ranked, client, loop, manage_subs=True,
@@ -339,6 +622,7 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
     continuous/"moving". This can't be gotten with the various ``*Candle``
     calls because the limit for ``period="M1"`` is 1000, but we'd need 1440.
     """
+    import asyncio
     if manage_sigs:
         # Actually unnecessary since existing uses default handler
         old_sig_info = remove_async_sig_handlers("SIGINT", loop=loop).pop()
@@ -363,6 +647,10 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
         # should have closure over once initialized below, will be the same
         # object when the trap is sprung
         add_async_sig_handlers(("SIGINT", rt_sig_cb), loop=loop)
+        if client.latency is not None:
+            add_async_sig_handlers(
+                ("SIGUSR1", lambda: _dump_latency(client)), loop=loop
+            )
     #
     c_fg = client.foreground_256
     c_bg = client.background_256
@@ -374,6 +662,7 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
             c_bg = client.background_24
     #
     all_subs = set(ranked)
+    rates = None
     # Ensure conversion pairs available for all volume units
     if VOL_UNIT:
         if "USD" not in VOL_UNIT and VOL_UNIT not in client.markets:
@@ -384,11 +673,28 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
             if VOL_UNIT == "USD" and "USD" not in client.markets:
                 assert "USDT" in client.markets
                 globals()["VOL_UNIT"] = "USDT"
-            all_subs |= await client.get_market_conversion_pairs(VOL_UNIT)
+            from terminal_coin_ticker.rates import RateGraph
+            conversions = await client.get_market_conversion_pairs()
+            rates = RateGraph(client, conversions, VOL_UNIT)
+            for sym in ranked:
+                if rates.add_source(client.symbols[sym]["curQ"]) is None:
+                    client.echo("No %s rate for %r" % (VOL_UNIT, sym), 3)
+            all_subs |= rates.pairs
         else:
             client.echo("The ``VOL_UNIT`` option requires ``manage_subs``", 3)
             globals()["VOL_UNIT"] = None
     #
+    # Legs only needed by the arbitrage rows come and go with the rest but
+    # are neither waited on nor held to ``_check_timestamps``' standards
+    scanner = None
+    arb_legs = set()
+    if ARB_ROWS:
+        from terminal_coin_ticker.arbitrage import TriangleScanner
+        scanner = TriangleScanner(client)
+        if manage_subs:
+            arb_legs = scanner.legs_near(ranked, client.markets) - all_subs
+            all_subs |= arb_legs
+    #
     # Results to return
     out_futs = {}
     #
@@ -399,7 +705,9 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
         await asyncio.gather(*map(client.subscribe_ticker, all_subs))
         max_tries = 3
         while max_tries:
-            if all(s in clt and s in cls for s in ranked):
+            if (all(s in clt and s in cls for s in ranked) and
+                    all(s in clt and clt[s].last for
+                        s in all_subs - arb_legs)):
                 break
             await asyncio.sleep(1)
             max_tries -= 1
@@ -412,26 +720,24 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
     #
     # TODO determine practicality of using existing volume rankings reaped
     # during arg parsing via in ``choose_pairs()``
+    if rates is not None:
+        rates.refresh(rates.pairs)
     if VOL_UNIT and VOL_SORTED:
-        vr = sorted((_convert_volume(client, s, cls[s]["curB"], cls[s]["curQ"],
-                                     decimate(clt[s])), s)
-                    for s in ranked)
-        ranked = [s for v, s in vr]
-    #
-    # Arbitrarily assume biggest volume and/or change could grow 10x between
-    # open/close, so +1 for those.
-    #
-    # TODO move all this widths figuring to a separate coro that updates some
-    # shared location at regular intervals. If max column width is exceeded,
-    # just lower precision for the offending item. So, if some "change" value
-    # were to grow from 99.99 to 100.00, make it 100.0 instead.
+        vr = ((_convert_volume(rates, cls[s]["curQ"], clt[s]), s)
+              for s in ranked)
+        # Unconvertible (NaN) volumes sink to the bottom
+        ranked = [s for v, s in sorted((v if v == v else -1.0, s) for
+                                       v, s in vr)]
+    #
+    # These are only starting widths. Once running, a cell that outgrows
+    # its column loses precision before the column is widened (the whole
+    # board then being reflowed), so 99.99 -> 100.00 shows as 100.0.
     sep = "/"
     volstr = "Vol (%s)" % (VOL_UNIT or "base") + ("  " if VOL_UNIT else "")
-    if VOL_UNIT:
-        try:
-            vprec = "USD ETH BTC".split().index(VOL_UNIT)
-        except ValueError:
-            vprec = 0  # Covers USDT and corners like BNB, XRP, BCH
+    vprec = 0  # Covers USDT and corners like BNB, XRP, BCH
+    if VOL_UNIT in ("USD", "ETH", "BTC"):
+        vprec = "USD ETH BTC".split().index(VOL_UNIT)
+    places = {s: _price_places(client, s) for s in ranked}
     # Market (symbol) pairs will be "concatenated" (no intervening padding)
     sym_widths = (
         # Base
@@ -446,23 +752,23 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
         # 1: Exchange name
         max(sum(sym_widths), len(client.exchange)),
         # 2: Price
-        max(len("{:.2f}".format(Dec(clt[s]["last"])) if
-                "USD" in s else clt[s]["last"]) for s in ranked),
+        max(len(format_scaled(clt[s].last, clt[s].pdp, places[s]))
+            for s in ranked),
         # 3: Volume
         max(*(len("{:,.{pc}f}"
-                  .format(_convert_volume(client, s, cls[s]["curB"],
-                                          cls[s]["curQ"], decimate(clt[s])),
-                          pc=vprec) if VOL_UNIT else clt[s]["volB"])
+                  .format(_convert_volume(rates, cls[s]["curQ"], clt[s]),
+                          pc=vprec) if VOL_UNIT else
+                  format_scaled(clt[s].volB, clt[s].qdp))
               for s in ranked), len(volstr)),
         # 4: Bid
-        max(len("{:.2f}".format(Dec(clt[s]["bid"])) if
-                "USD" in s else clt[s]["bid"]) for s in ranked),
+        max(len(format_scaled(clt[s].bid or 0, clt[s].pdp, places[s]))
+            for s in ranked),
         # 5: Ask
-        max(len("{:.2f}".format(Dec(clt[s]["ask"])) if
-                "USD" in s else clt[s]["ask"]) for s in ranked),
-        # 6: Change (should maybe do max++ for breathing room)
-        max(len("{:+.3f}%".format(
-            (Dec(clt[s]["last"]) - Dec(clt[s]["open"])) / Dec(clt[s]["open"])
+        max(len(format_scaled(clt[s].ask or 0, clt[s].pdp, places[s]))
+            for s in ranked),
+        # 6: Change
+        max(len("{:+.3%}".format(
+            (clt[s].last - clt[s].open) / clt[s].open
         )) for s in ranked),
     )
     pad = 2
@@ -472,56 +778,82 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
     del cls, clt
     #
     # Die nicely when needed width exceeds what's available
-    if sum(widths) > os.get_terminal_size().columns:
+    columns = os.get_terminal_size().columns
+    if sum(widths) > columns:
         msg = ("Insufficient terminal width. Need %d more column(s)."
-               % (sum(widths) - os.get_terminal_size().columns))
+               % (sum(widths) - columns))
         out_futs["error"] = msg
         if manage_subs:
             out_futs["subs"] = await asyncio.gather(
                 *map(client.unsubscribe_ticker, all_subs)
             )
         return out_futs
-    # Format string for actual line items.
-    fmt_parts = [
-        "{_beg}{:%d}" % widths[0],
-        "{_sym}{base}{_sepl}{sep}{_sepr}{quote:<{quote_w}}",
-        "{_prc}{last:<%df}" % widths[2],
-        "{_vol}" + ("{volconv:>%d,.%df}%s" %
-                    (widths[3] - pad, vprec, " " * pad) if
-                    VOL_UNIT else "{volB:<%df}" % widths[3]),
-        "{bid:<%df}" % widths[4],
-        "{ask:<%df}" % widths[5],
-        "{_chg}{chg:>+%d.3%%}" % widths[6],
-        "{:%d}{_end}" % widths[7]
-    ]
-    fmt = "".join(fmt_parts)
-    #
-    _print_heading(client, (c_bg, c_fg), widths, len(ranked), volstr)
-    #
-    semaphore = asyncio.Semaphore(1)
-    snapshots = {}
-    coros = []
+    layout = ColumnLayout(widths, pad, limit=columns)
+    numrows = len(ranked) + ARB_ROWS
+
+    def make_fmts(widths):
+        """Format strings for actual line items, by symbol"""
+        fmt_parts = [
+            "{_beg}{:%d}" % widths[0],
+            "{_sym}{base}{_sepl}{sep}{_sepr}{quote:<{quote_w}}",
+            "{_prc}{last:<%d}" % widths[2],
+            "{_vol}" + ("{volconv:>%d}%s" % (widths[3] - pad, " " * pad) if
+                        VOL_UNIT else "{volB:<%d}" % widths[3]),
+            "{bid:<%d}" % widths[4],
+            "{ask:<%d}" % widths[5],
+            "{_chg}{chg:>%d}" % widths[6],
+            "{:%d}{_end}" % widths[7]
+        ]
+        fmt = "".join(fmt_parts)
+        return {sym: fmt.replace("{quote_w}", "%d" % (
+            widths[1] - len(client.symbols[sym]["curB"]) - len(sep)
+        )) for sym in ranked}
+
+    def reflow():
+        """Rows other than ticker lines needing redrawn after a reflow"""
+        widths = layout.widths
+        for sym, fmt in make_fmts(widths).items():
+            lines[sym].fmt = fmt
+        heading = _render_heading(client, (c_bg, c_fg), widths, numrows,
+                                  volstr).split("\n")[:-numrows]
+        rows = [(numrows + len(heading) - 1 - n, text) for
+                n, text in enumerate(heading)]
+        if arb is not None:
+            arb.shown.clear()
+            rows.extend(arb.paint(()))
+        return rows
+    #
+    _print_heading(client, (c_bg, c_fg), layout.widths, numrows, volstr)
+    compositor = Compositor()
+    compositor.anchor()
+    if client.exporter is not None:
+        client.exporter.watch("tct_repaints_total", lambda: compositor.frames)
+        client.exporter.watch("tct_written_bytes_total",
+                              lambda: compositor.bytes_written)
+    #
+    lines = {}
+    fmts = make_fmts(layout.widths)
     for lnum, sym in enumerate(ranked):
         base = client.symbols[sym]["curB"]
         quote = client.symbols[sym]["curQ"]
-        fmt_nudge = (
-            "".join(
-                (fmt_parts[n].replace("f}", ".2f}") if n in (1, 4, 5) else
-                 fmt_parts[n] for n in range(len(fmt_parts)))
-            )
-            if "USD" in quote and Dec(client.ticker[sym]["last"]) >= Dec(10)
-            else fmt
-        ).replace("{quote_w}", "%d" % (widths[1] - len(base) - len(sep)))
-        #
-        coros.append(_paint_ticker_line(
-            client, lnum, sym, semaphore, snapshots, fmt_nudge,
-            (c_bg, c_fg), (base, quote), wait=(0.1 * len(ranked)),
-            pulse_over=(PULSE_OVER if PULSE else 100.0)
-        ))
+        lines[sym] = TickerLine(
+            client, lnum, sym, fmts[sym], (c_bg, c_fg), (base, quote),
+            pulse_over=(PULSE_OVER if PULSE else 100.0), places=places[sym],
+            rates=rates, layout=layout, vol_places=vprec
+        )
+    arb = scanner and ArbLines(scanner, len(ranked), ARB_ROWS,
+                               layout.widths, (c_bg, c_fg))
+    feed = client.add_update_feed(*all_subs)
+    ranker = (VolumeRanker(lines, rates) if
+              LIVE_SORT and VOL_SORTED and rates else None)
+    board = _paint_ticker_board(client, lines, feed, compositor, rates=rates,
+                                arb=arb, ranker=ranker, layout=layout,
+                                reflow=reflow)
     # Should conversion pairs (all_subs) be included here if not displayed?
-    ts_chk = _check_timestamps(all_subs, client, rt_sig_cb, STRICT_TIME)
+    ts_chk = _check_timestamps(all_subs - arb_legs, client, rt_sig_cb,
+                               STRICT_TIME)
     #
-    tasks = [asyncio.ensure_future(c) for c in (*coros, ts_chk)]
+    tasks = [asyncio.ensure_future(c) for c in (board, ts_chk)]
     gathered = asyncio.gather(*tasks)
     #
     try:
@@ -535,6 +867,7 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
         elif not isinstance(exc, asyncio.CancelledError):
             out_futs["gathered"] = {"error": format_exc()}
     finally:
+        client.remove_update_feed(feed)
         if manage_subs:
             client.echo("Unsubscribing", 6)
             gunsubs = asyncio.gather(*map(client.unsubscribe_ticker, all_subs))
@@ -552,6 +885,8 @@ async def do_run_ticker(ranked, client, loop, manage_subs=True,
                         out_futs["subs"] = {"error": tb_str}
         if manage_sigs:
             add_async_sig_handlers(old_sig_info, loop=loop)
+            if client.latency is not None:
+                remove_async_sig_handlers("SIGUSR1", loop=loop)
     return out_futs
 
 
@@ -637,18 +972,25 @@ async def choose_pairs(client):
 
 
 async def main(loop, Client):
-    async with Client(VERBOSITY, LOGFILE, USE_AIOHTTP) as client:
+    async with Client(VERBOSITY, LOGFILE, USE_AIOHTTP,
+                      json_decoder=JSON_DECODER, capture=CAPTURE,
+                      replay=REPLAY, replay_speed=REPLAY_SPEED,
+                      latency=LATENCY, metrics=METRICS) as client:
         #
         ranked_syms = await choose_pairs(client)
         #
         rt_fut = do_run_ticker(ranked_syms, client, loop)
-        return await rt_fut
+        results = await rt_fut
+        if client.latency is not None:
+            results["latency"] = client.latency.summary()
+        return results
 
 
 def main_entry():
     global HAS_24, LOGFILE, PULSE, PULSE_OVER, HEADING, MAX_HEIGHT, \
             STRICT_TIME, VERBOSITY, VOL_SORTED, VOL_UNIT, USE_AIOHTTP, \
-            AUTO_FILL, AUTO_CULL, EXCHANGE, MAX_FILL
+            AUTO_FILL, AUTO_CULL, EXCHANGE, MAX_FILL, JSON_DECODER, ARB_ROWS, \
+            LIVE_SORT, CAPTURE, REPLAY, REPLAY_SPEED, LATENCY, METRICS
     #
     if sys.platform != 'linux':
         raise SystemExit("Sorry, but this probably only works on Linux")
@@ -657,24 +999,27 @@ def main_entry():
     #
     if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h"):
         print(__doc__.partition("\nWarn")[0].partition("::\n")[-1])
-        with open(__file__) as f:
-            hunks = f.read().split("\n\n")
-        lines = [p for p in hunks if
-                 p.startswith("# Env vars")].pop().split("\n")[1:]
-        from ast import literal_eval
-        fmt = "{:<4}{:<12}{:<8}{:<9}{}"
-        for line in lines:
-            name, rest = line.split("=")
-            val, doc = rest.split("#")
-            typ = "<%s>" % type(literal_eval(val.strip())).__name__
-            val = ("%s" % val.strip('" ').replace("True", "1")
-                   .replace("False", "0").replace("None", "''"))
-            print(fmt.format("", name.strip(), typ, val, doc.strip()))
+        fmt = "{:<4}{:<13}{:<8}{:<9}{}"
+        for name, doc in ENV_DOCS.items():
+            val = globals()[name]
+            typ = "<%s>" % type(val).__name__
+            val = {True: "1", False: "0", None: "''"}.get(val, val)
+            print(fmt.format("", name, typ, val, doc))
         sys.exit()
     #
+    import asyncio
     VERBOSITY = int(os.getenv("VERBOSITY", VERBOSITY))
     USE_AIOHTTP = any(s == os.getenv("USE_AIOHTTP", str(USE_AIOHTTP)).lower()
                       for s in "yes true 1".split())
+    JSON_DECODER = os.getenv("JSON_DECODER", JSON_DECODER).lower()
+    if JSON_DECODER in ("", "null", "none"):
+        JSON_DECODER = None
+    CAPTURE = os.getenv("CAPTURE", CAPTURE)
+    REPLAY = os.getenv("REPLAY", REPLAY)
+    REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", REPLAY_SPEED))
+    LATENCY = any(s == os.getenv("LATENCY", str(LATENCY)).lower()
+                  for s in "yes on true 1".split())
+    METRICS = os.getenv("METRICS", METRICS)
     HAS_24 = (
         any(s == os.getenv("COLORTERM", "") for s in ("24bit", "truecolor")) or
         any(s == os.getenv("HAS_24", str(HAS_24)).lower() for
@@ -688,9 +1033,14 @@ def main_entry():
     PULSE_OVER = float(os.getenv("PULSE_OVER", PULSE_OVER))
     _heading = os.getenv("HEADING", HEADING)
     HEADING = (_heading if _heading in Headings.__members__ else HEADING)
-    MAX_HEIGHT = os.get_terminal_size().lines - Headings[HEADING].value
+    ARB_ROWS = os.getenv("ARB_ROWS", str(ARB_ROWS))
+    ARB_ROWS = int(ARB_ROWS) if ARB_ROWS.isdigit() else 0
+    MAX_HEIGHT = (os.get_terminal_size().lines - Headings[HEADING].value -
+                  ARB_ROWS)
     VOL_SORTED = any(s == os.getenv("VOL_SORTED", str(VOL_SORTED)).lower()
                      for s in "yes on true 1".split())
+    LIVE_SORT = any(s == os.getenv("LIVE_SORT", str(LIVE_SORT)).lower()
+                    for s in "yes on true 1".split())
     VOL_UNIT = os.getenv("VOL_UNIT", VOL_UNIT)
     if VOL_UNIT.lower() in ("", "null", "none"):
         VOL_UNIT = None
@@ -713,30 +1063,23 @@ def main_entry():
     #
     # XXX should probably print message saying exchange not yet supported
     EXCHANGE = os.getenv("EXCHANGE", EXCHANGE).lower()
-    if EXCHANGE == "binance":
-        Client = binance.BinanceClient
-    else:
-        Client = hitbtc.HitBTCClient
+    from terminal_coin_ticker.clients import EXCHANGES, get_client
+    Client = get_client(EXCHANGE if EXCHANGE in EXCHANGES else "hitbtc")
     #
-    # Since this doesn't use curses, shell out to get cursor vis
-    # escape sequences, if supported (absent in ansi and vt100).
-    civis = cnorm = ""
-    from subprocess import check_output
-    try:
-        civis = check_output(["tput", "civis"]).decode()
-        cnorm = check_output(["tput", "cnorm"]).decode()
-    except FileNotFoundError:
-        pass
-    else:
-        print(civis, end="", flush=True)
+    # Cursor vis escape sequences, if supported (absent in ansi and vt100)
+    civis, cnorm = terminfo.get("civis"), terminfo.get("cnorm")
+    print(civis, end="", flush=True)
     #
     try:
         if LOGFILE and os.path.exists(LOGFILE):
             from contextlib import redirect_stderr
             with open(os.getenv("LOGFILE"), "w") as LOGFILE:
                 with redirect_stderr(LOGFILE):
-                    ppj(loop.run_until_complete(main(loop, Client)),
-                        file=LOGFILE)
+                    results = loop.run_until_complete(main(loop, Client))
+                    latency = results.pop("latency", None)
+                    ppj(results, file=LOGFILE)
+                    if latency:
+                        print(latency, file=LOGFILE)
         else:
             VERBOSITY = 3
             results = loop.run_until_complete(main(loop, Client))
@@ -746,6 +1089,8 @@ def main_entry():
                     print("", item["error"], sep="\n", file=sys.stderr)
                 except (TypeError, KeyError):
                     pass
+            if results.get("latency"):
+                print("", results["latency"], sep="\n", file=sys.stderr)
     # XXX not sure why this was ever added
     except RuntimeError as e:
         if "loop stopped before Future completed" not in str(e):